@@ -1,10 +1,21 @@
 import streamlit as st
 import sqlite3
 import pandas as pd
+import numpy as np
 import hashlib
 import os
 from datetime import datetime
 import io
+import threading
+import re
+import time
+import json
+from collections import Counter, deque
+from contextlib import contextmanager
+from bisect import bisect_left
+import random
+import unicodedata
+import gc
 
 # Configuración
 st.set_page_config(
@@ -14,14 +25,219 @@ st.set_page_config(
 )
 
 # Constantes
-DB_FILE = "peliculas.db"
+DB_FILE = os.environ.get("PELICULAS_DB", "peliculas.db")
+ROLES = ["admin", "editor", "viewer"]
+USUARIOS_POR_PAGINA = [25, 50, 100]
+PELICULAS_POR_PAGINA = 20
+MAX_METRICAS = 5000
+METRICAS_FILE = "metricas.jsonl"
+BACKUP_DIR = os.environ.get("PELICULAS_BACKUPS", "backups")
+BACKUP_RETENCION = 10
+BACKUP_PAGINAS_POR_PASO = 256
+BACKUP_PAUSA = 0.005
+MANTENIMIENTO_INTERVALO = 30
+MANTENIMIENTO_INACTIVIDAD = 10
+MANTENIMIENTO_UMBRAL_FILAS = 1000
+ANALISIS_LIMITE = 1000
+VACUUM_PAGINAS_POR_PASO = 256
+VACUUM_MAX_PASOS = 40
+DUPLICADOS_UMBRAL = 0.7
+DUPLICADOS_MAX_CANDIDATOS = 20
+MINHASH_BANDAS = 16
+MINHASH_FILAS = 5
+# Permutaciones h -> a*h + b (mod 2^64) con a impar, calculadas con numpy
+FACTORES_MINHASH = np.array([random.Random(7 + i).getrandbits(64) | 1 for i in range(MINHASH_BANDAS * MINHASH_FILAS)],
+                            dtype=np.uint64)
+DESPLAZAMIENTOS_MINHASH = np.array([random.Random(1007 + i).getrandbits(64) for i in range(MINHASH_BANDAS * MINHASH_FILAS)],
+                                   dtype=np.uint64)
+# Combinan las filas de cada banda en un entero; la sal distingue las bandas entre sí
+MULTIPLICADORES_BANDA = np.array([random.Random(97 + i).getrandbits(64) | 1 for i in range(MINHASH_FILAS)],
+                                 dtype=np.uint64)
+SALES_BANDA = np.array([random.Random(197 + i).getrandbits(64) for i in range(MINHASH_BANDAS)], dtype=np.uint64)
+LOTE_FIRMAS = 2000
+SUGERENCIAS_MAX = 8
+SUGERENCIAS_OPCIONES_MAX = 1000
+CAMPOS_SUGERENCIAS = ['nombre', 'genero', 'idioma', 'pais']
+COLUMNAS_IMPORTACION = {
+    'nombre': ['nombre', 'name', 'title', 'pelicula', 'movie'],
+    'genero': ['genero', 'genre', 'categoria', 'category'],
+    'idioma': ['idioma', 'language', 'lenguaje'],
+    'traduccion': ['traduccion', 'translation', 'subtitulos'],
+    'fecha': ['fecha', 'date', 'año', 'year', 'estreno'],
+    'pais': ['pais', 'country', 'origen', 'origin'],
+}
+
+# ==================== CONSULTAS ====================
+# Todas las sentencias SQL de la app. verificar_planes.py revisa su plan de
+# ejecución para que ninguna consulta caliente haga un recorrido completo
+# de la tabla o un ordenamiento con B-tree temporal.
+CONSULTAS = {
+    'contar_usuario': "SELECT COUNT(*) FROM usuarios WHERE username=?",
+    'insertar_usuario': "INSERT INTO usuarios (username, password, nombre, rol) VALUES (?, ?, ?, ?)",
+    'verificar_login': "SELECT nombre, rol FROM usuarios WHERE username=? AND password=? AND activo=1",
+    'autorizacion_usuario': "SELECT rol, activo FROM usuarios WHERE username=?",
+    'listar_usuarios': "SELECT id, username, nombre, rol, activo, fecha_creacion FROM usuarios ORDER BY fecha_creacion DESC",
+    'actualizar_usuario': "UPDATE usuarios SET username=?, nombre=?, rol=?, activo=? WHERE id=?",
+    'cambiar_password': "UPDATE usuarios SET password=? WHERE id=?",
+    'existe_pelicula': "SELECT 1 FROM peliculas LIMIT 1",
+    'insertar_pelicula': "INSERT INTO peliculas (nombre, genero, idioma, traduccion, fecha, pais, usuario_creacion) VALUES (?, ?, ?, ?, ?, ?, ?)",
+    'listar_peliculas': "SELECT * FROM peliculas ORDER BY fecha_creacion DESC",
+    'pagina_peliculas': "SELECT * FROM peliculas ORDER BY fecha_creacion DESC, id DESC LIMIT ? OFFSET ?",
+    'contar_peliculas': "SELECT COUNT(*) FROM peliculas",
+    'resumen_peliculas': "SELECT COUNT(*), COUNT(DISTINCT genero), COUNT(DISTINCT idioma), "
+                         "COUNT(CASE WHEN traduccion = 'Sí' THEN 1 END) FROM peliculas",
+    'titulos_desde_id': "SELECT id, nombre FROM peliculas WHERE id > ? ORDER BY id",
+    'valores_desde_id': "SELECT id, nombre, genero, idioma, pais FROM peliculas WHERE id > ? ORDER BY id",
+    'creador_pelicula': "SELECT usuario_creacion, nombre, genero, idioma, pais FROM peliculas WHERE id=?",
+    'eliminar_pelicula': "DELETE FROM peliculas WHERE id=?",
+    'exportar_peliculas': "SELECT * FROM peliculas",
+    'limpiar_peliculas': "DELETE FROM peliculas",
+    'reiniciar_secuencia_peliculas': "DELETE FROM sqlite_sequence WHERE name='peliculas'",
+}
+
+# Consultas que recorren una tabla a propósito, con el motivo. Cualquier otro
+# SCAN en el plan, aunque use un índice, es una regresión (verificar_planes.py
+# solo acepta un SCAN sobre índice sin ordenamiento temporal si la consulta tiene LIMIT).
+# Brecha conocida: la búsqueda por subcadena y los totales siguen siendo O(n).
+CONSULTAS_ESCANEO_COMPLETO = {
+    'listar_usuarios': "la gestión de usuarios filtra y pagina la lista completa en memoria",
+    'listar_peliculas': "brecha conocida: la búsqueda por subcadena en nombre, género y país no tiene índice",
+    'contar_peliculas': "brecha conocida: SQLite no guarda el total; recorre el índice más chico",
+    'resumen_peliculas': "brecha conocida: métricas del dashboard, un solo recorrido en SQLite sin pasar filas a Python",
+    'exportar_peliculas': "la exportación lee la tabla completa",
+    'limpiar_peliculas': "la limpieza borra la tabla completa",
+    'reiniciar_secuencia_peliculas': "sqlite_sequence tiene una fila por tabla",
+}
+
+INDICES = [
+    "CREATE INDEX IF NOT EXISTS idx_peliculas_fecha_creacion ON peliculas (fecha_creacion)",
+    "CREATE INDEX IF NOT EXISTS idx_usuarios_fecha_creacion ON usuarios (fecha_creacion)",
+]
+
+# ==================== INSTRUMENTACIÓN ====================
+@st.cache_resource
+def registro_metricas():
+    """Métricas de consultas y secciones compartidas por todas las sesiones del proceso"""
+    return {
+        'consultas': deque(maxlen=MAX_METRICAS),
+        'secciones': deque(maxlen=MAX_METRICAS),
+        'ultima_actividad': 0,
+        'lock': threading.Lock()
+    }
+
+def huella_sql(sql):
+    """Normalizar una sentencia SQL reemplazando literales para agrupar consultas equivalentes"""
+    huella = re.sub(r"'(?:[^']|'')*'", "?", sql)
+    huella = re.sub(r"\b\d+(?:\.\d+)?\b", "?", huella)
+    huella = re.sub(r"\(\s*\?(?:\s*,\s*\?)*\s*\)", "(?)", huella)
+    return " ".join(huella.split())
+
+def registrar_consulta(sql, filas, duracion, error=None):
+    """Registrar una sentencia y devolver su entrada para poder completarla al leer filas"""
+    entrada = {
+        'timestamp': time.time(),
+        'consulta': huella_sql(sql),
+        'filas': filas,
+        'duracion_ms': duracion * 1000,
+        'error': error
+    }
+    metricas = registro_metricas()
+    with metricas['lock']:
+        metricas['consultas'].append(entrada)
+        metricas['ultima_actividad'] = entrada['timestamp']
+    return entrada
+
+@contextmanager
+def medir_seccion(nombre):
+    """Cronometrar una sección del rerun (también se puede usar como decorador)"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        metricas = registro_metricas()
+        with metricas['lock']:
+            metricas['secciones'].append({
+                'timestamp': time.time(),
+                'seccion': nombre,
+                'duracion_ms': (time.perf_counter() - inicio) * 1000
+            })
+
+class CursorInstrumentado(sqlite3.Cursor):
+    """Cursor que mide cada sentencia, incluyendo el tiempo de lectura de filas"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._entrada = None
+    
+    def _medir(self, metodo, sql, parametros):
+        inicio = time.perf_counter()
+        try:
+            resultado = metodo(self, sql, parametros)
+        except Exception as e:
+            self._entrada = None
+            registrar_consulta(sql, 0, time.perf_counter() - inicio, type(e).__name__)
+            raise
+        # En un SELECT las filas se suman después, al hacer fetch
+        filas = max(self.rowcount, 0) if self.description is None else 0
+        self._entrada = registrar_consulta(sql, filas, time.perf_counter() - inicio)
+        return resultado
+    
+    def _leer(self, metodo, *args):
+        inicio = time.perf_counter()
+        filas = metodo(self, *args)
+        if self._entrada is not None:
+            self._entrada['duracion_ms'] += (time.perf_counter() - inicio) * 1000
+            if isinstance(filas, list):
+                self._entrada['filas'] += len(filas)
+            elif filas is not None:
+                self._entrada['filas'] += 1
+        return filas
+    
+    def execute(self, sql, parameters=()):
+        return self._medir(sqlite3.Cursor.execute, sql, parameters)
+    
+    def executemany(self, sql, seq_of_parameters):
+        return self._medir(sqlite3.Cursor.executemany, sql, seq_of_parameters)
+    
+    def fetchone(self):
+        return self._leer(sqlite3.Cursor.fetchone)
+    
+    def fetchmany(self, size=None):
+        return self._leer(sqlite3.Cursor.fetchmany, self.arraysize if size is None else size)
+    
+    def fetchall(self):
+        return self._leer(sqlite3.Cursor.fetchall)
+
+class ConexionInstrumentada(sqlite3.Connection):
+    """Conexión cuyos cursores registran duración y filas de cada sentencia"""
+    
+    def cursor(self, factory=CursorInstrumentado):
+        return super().cursor(factory)
+    
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+    
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+def conectar_db():
+    return sqlite3.connect(DB_FILE, factory=ConexionInstrumentada)
+
+def error_db(e):
+    """Mostrar un error de lectura (p. ej. 'database is locked') en vez de una lista vacía silenciosa"""
+    st.error(f"❌ Error de base de datos: {e}")
 
 def init_database():
     """Inicializar base de datos con tablas mejoradas"""
     try:
-        conn = sqlite3.connect(DB_FILE)
+        conn = conectar_db()
         c = conn.cursor()
         
+        # auto_vacuum solo tiene efecto si se define antes de crear las tablas;
+        # WAL permite leer mientras se escribe y es persistente en el archivo
+        c.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        c.execute("PRAGMA journal_mode=WAL")
+        
         # Tabla de películas
         c.execute('''
             CREATE TABLE IF NOT EXISTS peliculas (
@@ -50,29 +266,32 @@ def init_database():
             )
         ''')
         
+        for indice in INDICES:
+            c.execute(indice)
+        
         # Usuario admin por defecto
-        c.execute("SELECT COUNT(*) FROM usuarios WHERE username='admin'")
+        c.execute(CONSULTAS['contar_usuario'], ("admin",))
         if c.fetchone()[0] == 0:
             password_hash = hash_password("admin123")
-            c.execute("INSERT INTO usuarios (username, password, nombre, rol) VALUES (?, ?, ?, ?)",
+            c.execute(CONSULTAS['insertar_usuario'],
                      ("admin", password_hash, "Administrador Principal", "admin"))
         
         # Usuario viewer por defecto
-        c.execute("SELECT COUNT(*) FROM usuarios WHERE username='viewer'")
+        c.execute(CONSULTAS['contar_usuario'], ("viewer",))
         if c.fetchone()[0] == 0:
             password_hash = hash_password("viewer123")
-            c.execute("INSERT INTO usuarios (username, password, nombre, rol) VALUES (?, ?, ?, ?)",
+            c.execute(CONSULTAS['insertar_usuario'],
                      ("viewer", password_hash, "Usuario Viewer", "viewer"))
         
         # Datos de ejemplo
-        c.execute("SELECT COUNT(*) FROM peliculas")
-        if c.fetchone()[0] == 0:
+        c.execute(CONSULTAS['existe_pelicula'])
+        if c.fetchone() is None:
             peliculas = [
                 ("Inception", "Ciencia Ficción", "Inglés", "Sí", "2010-07-16", "USA", "admin"),
                 ("El Laberinto del Fauno", "Fantasía", "Español", "Sí", "2006-10-11", "España", "admin"),
                 ("Parasite", "Thriller", "Coreano", "Sí", "2019-05-30", "Corea del Sur", "admin")
             ]
-            c.executemany("INSERT INTO peliculas (nombre, genero, idioma, traduccion, fecha, pais, usuario_creacion) VALUES (?, ?, ?, ?, ?, ?, ?)", peliculas)
+            c.executemany(CONSULTAS['insertar_pelicula'], peliculas)
         
         conn.commit()
         conn.close()
@@ -85,15 +304,17 @@ def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
 def verificar_login(username, password):
-    """Verificar login y obtener datos del usuario"""
+    """Verificar login y obtener datos del usuario.
+
+    Los errores de la BD se propagan para no mostrarlos como credenciales incorrectas.
+    """
+    conn = conectar_db()
     try:
-        conn = sqlite3.connect(DB_FILE)
         c = conn.cursor()
         password_hash = hash_password(password)
-        c.execute("SELECT nombre, rol FROM usuarios WHERE username=? AND password=? AND activo=1", 
+        c.execute(CONSULTAS['verificar_login'], 
                  (username, password_hash))
         result = c.fetchone()
-        conn.close()
         
         if result:
             return {
@@ -102,25 +323,126 @@ def verificar_login(username, password):
                 'username': username
             }
         return None
-    except:
+    finally:
+        conn.close()
+
+# ==================== CACHÉ DE AUTORIZACIÓN ====================
+@st.cache_resource
+def cache_autorizacion():
+    """Caché de rol/estado por username compartida por todas las sesiones del proceso"""
+    return {'version': 0, 'usuarios': {}, 'lock': threading.Lock()}
+
+def invalidar_autorizacion():
+    """Incrementar la versión de la tabla de usuarios para invalidar la caché"""
+    cache = cache_autorizacion()
+    with cache['lock']:
+        cache['version'] += 1
+
+def obtener_autorizacion(username):
+    """Obtener rol y estado activo del usuario; solo consulta la BD si la entrada está desactualizada"""
+    cache = cache_autorizacion()
+    version = cache['version']
+    entrada = cache['usuarios'].get(username)
+    if entrada is not None and entrada['version'] == version:
+        return entrada
+    
+    try:
+        conn = conectar_db()
+        c = conn.cursor()
+        c.execute(CONSULTAS['autorizacion_usuario'], (username,))
+        result = c.fetchone()
+        conn.close()
+    except sqlite3.Error:
+        # Un error transitorio (p. ej. BD bloqueada) no es una desactivación:
+        # se usa la última entrada conocida aunque esté desactualizada
+        if entrada is not None:
+            return entrada
+        raise
+    
+    # Se guarda con la versión leída antes de consultar: si hubo un cambio
+    # concurrente, la entrada quedará obsoleta y se recargará en la próxima consulta
+    entrada = {
+        'rol': result[0] if result else None,
+        'activo': bool(result and result[1] == 1),
+        'version': version
+    }
+    with cache['lock']:
+        cache['usuarios'][username] = entrada
+    return entrada
+
+def rol_actual():
+    """Rol vigente del usuario en sesión (None si fue desactivado, eliminado o no se pudo verificar)"""
+    try:
+        entrada = obtener_autorizacion(st.session_state.user_data['username'])
+    except sqlite3.Error:
+        return None
+    if not entrada['activo']:
         return None
+    return entrada['rol']
 
+def revalidar_sesion():
+    """Sincronizar el rol de la sesión con la caché al inicio de cada rerun"""
+    try:
+        entrada = obtener_autorizacion(st.session_state.user_data['username'])
+    except sqlite3.Error:
+        # Sin poder consultar la BD se mantiene la sesión con el rol que ya tenía
+        return True
+    rol = entrada['rol'] if entrada['activo'] else None
+    if rol is None:
+        st.session_state.clear()
+        st.session_state.logged_in = False
+        return False
+    st.session_state.user_data['rol'] = rol
+    return True
+
+@medir_seccion("datos: obtener_peliculas")
 def obtener_peliculas():
     try:
-        conn = sqlite3.connect(DB_FILE)
+        conn = conectar_db()
+        c = conn.cursor()
+        c.execute(CONSULTAS['listar_peliculas'])
+        peliculas = c.fetchall()
+        conn.close()
+        return peliculas
+    except sqlite3.Error as e:
+        error_db(e)
+        return []
+
+@medir_seccion("datos: obtener_pagina_peliculas")
+def obtener_pagina_peliculas(limite, desplazamiento=0):
+    """Una página de películas, de la más reciente a la más antigua.
+
+    OFFSET recorre las filas que salta: las páginas profundas cuestan O(desplazamiento).
+    """
+    try:
+        conn = conectar_db()
         c = conn.cursor()
-        c.execute("SELECT * FROM peliculas ORDER BY fecha_creacion DESC")
+        c.execute(CONSULTAS['pagina_peliculas'], (limite, desplazamiento))
         peliculas = c.fetchall()
         conn.close()
         return peliculas
-    except:
+    except sqlite3.Error as e:
+        error_db(e)
         return []
 
+def contar_peliculas():
+    try:
+        conn = conectar_db()
+        c = conn.cursor()
+        c.execute(CONSULTAS['contar_peliculas'])
+        total = c.fetchone()[0]
+        conn.close()
+        return total
+    except sqlite3.Error as e:
+        error_db(e)
+        return 0
+
 def agregar_pelicula(nombre, genero, idioma, traduccion, fecha, pais, usuario):
+    genero, idioma, pais = canonizar('genero', genero), canonizar('idioma', idioma), canonizar('pais', pais)
     try:
-        conn = sqlite3.connect(DB_FILE)
+        conn = conectar_db()
         c = conn.cursor()
-        c.execute("INSERT INTO peliculas (nombre, genero, idioma, traduccion, fecha, pais, usuario_creacion) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        c.execute(CONSULTAS['insertar_pelicula'],
                  (nombre, genero, idioma, traduccion, fecha, pais, usuario))
         conn.commit()
         conn.close()
@@ -131,24 +453,24 @@ def agregar_pelicula(nombre, genero, idioma, traduccion, fecha, pais, usuario):
 def eliminar_pelicula(pelicula_id, usuario_actual):
     """Eliminar película con verificación de permisos"""
     try:
-        conn = sqlite3.connect(DB_FILE)
+        conn = conectar_db()
         c = conn.cursor()
         
         # Verificar si el usuario es admin o el creador de la película
-        c.execute("SELECT usuario_creacion FROM peliculas WHERE id=?", (pelicula_id,))
+        c.execute(CONSULTAS['creador_pelicula'], (pelicula_id,))
         resultado = c.fetchone()
         
         if not resultado:
             return False, "❌ Película no encontrada"
         
         usuario_creacion = resultado[0]
-        rol_actual = st.session_state.user_data['rol']
-        
         # Solo admin puede eliminar cualquier película, usuarios solo las suyas
-        if rol_actual == 'admin' or usuario_actual == usuario_creacion:
-            c.execute("DELETE FROM peliculas WHERE id=?", (pelicula_id,))
+        if usuario_actual == usuario_creacion or rol_actual() == 'admin':
+            c.execute(CONSULTAS['eliminar_pelicula'], (pelicula_id,))
             conn.commit()
             conn.close()
+            quitar_del_indice(pelicula_id)
+            quitar_sugerencias(pelicula_id, resultado[1:])
             return True, "✅ Película eliminada"
         else:
             conn.close()
@@ -158,28 +480,31 @@ def eliminar_pelicula(pelicula_id, usuario_actual):
         return False, f"❌ Error: {e}"
 
 # ==================== GESTIÓN DE USUARIOS ====================
+@medir_seccion("datos: obtener_usuarios")
 def obtener_usuarios():
     """Obtener lista de todos los usuarios (solo admin)"""
     try:
-        conn = sqlite3.connect(DB_FILE)
+        conn = conectar_db()
         c = conn.cursor()
-        c.execute("SELECT id, username, nombre, rol, activo, fecha_creacion FROM usuarios ORDER BY fecha_creacion DESC")
+        c.execute(CONSULTAS['listar_usuarios'])
         usuarios = c.fetchall()
         conn.close()
         return usuarios
-    except:
+    except sqlite3.Error as e:
+        error_db(e)
         return []
 
 def crear_usuario(username, password, nombre, rol):
     """Crear nuevo usuario"""
     try:
-        conn = sqlite3.connect(DB_FILE)
+        conn = conectar_db()
         c = conn.cursor()
         password_hash = hash_password(password)
-        c.execute("INSERT INTO usuarios (username, password, nombre, rol) VALUES (?, ?, ?, ?)",
+        c.execute(CONSULTAS['insertar_usuario'],
                  (username, password_hash, nombre, rol))
         conn.commit()
         conn.close()
+        invalidar_autorizacion()
         return True, "✅ Usuario creado correctamente"
     except sqlite3.IntegrityError:
         return False, "❌ El nombre de usuario ya existe"
@@ -189,12 +514,13 @@ def crear_usuario(username, password, nombre, rol):
 def actualizar_usuario(user_id, username, nombre, rol, activo):
     """Actualizar usuario existente"""
     try:
-        conn = sqlite3.connect(DB_FILE)
+        conn = conectar_db()
         c = conn.cursor()
-        c.execute("UPDATE usuarios SET username=?, nombre=?, rol=?, activo=? WHERE id=?",
+        c.execute(CONSULTAS['actualizar_usuario'],
                  (username, nombre, rol, activo, user_id))
         conn.commit()
         conn.close()
+        invalidar_autorizacion()
         return True, "✅ Usuario actualizado correctamente"
     except sqlite3.IntegrityError:
         return False, "❌ El nombre de usuario ya existe"
@@ -204,76 +530,129 @@ def actualizar_usuario(user_id, username, nombre, rol, activo):
 def cambiar_password_usuario(user_id, nueva_password):
     """Cambiar contraseña de usuario"""
     try:
-        conn = sqlite3.connect(DB_FILE)
+        conn = conectar_db()
         c = conn.cursor()
         password_hash = hash_password(nueva_password)
-        c.execute("UPDATE usuarios SET password=? WHERE id=?", (password_hash, user_id))
+        c.execute(CONSULTAS['cambiar_password'], (password_hash, user_id))
         conn.commit()
         conn.close()
         return True, "✅ Contraseña actualizada correctamente"
     except Exception as e:
         return False, f"❌ Error: {e}"
 
+def actualizar_usuarios_lote(cambios):
+    """Aplicar un lote de cambios de usuarios en una sola transacción"""
+    if not cambios:
+        return True, "ℹ️ No hay cambios que guardar"
+    
+    try:
+        conn = conectar_db()
+        try:
+            # Todo o nada: si un username está duplicado no se aplica ningún cambio
+            with conn:
+                conn.executemany(CONSULTAS['actualizar_usuario'],
+                                 [(username, nombre, rol, activo, user_id)
+                                  for user_id, username, nombre, rol, activo in cambios])
+        finally:
+            conn.close()
+        invalidar_autorizacion()
+        return True, f"✅ {len(cambios)} usuarios actualizados correctamente"
+    except sqlite3.IntegrityError:
+        return False, "❌ El nombre de usuario ya existe"
+    except Exception as e:
+        return False, f"❌ Error: {e}"
+
+def filtrar_usuarios(usuarios, busqueda):
+    """Filtrar usuarios por username o nombre"""
+    if not busqueda:
+        return usuarios
+    busqueda = busqueda.lower()
+    return [u for u in usuarios if busqueda in str(u[1]).lower() or busqueda in str(u[2]).lower()]
+
+def detectar_cambios_usuarios(df_original, df_editado):
+    """Comparar la página original con la editada y devolver las filas modificadas"""
+    cambios = []
+    columnas = ['Usuario', 'Nombre', 'Rol', 'Activo']
+    for (_, original), (_, editado) in zip(df_original.iterrows(), df_editado.iterrows()):
+        if any(original[col] != editado[col] for col in columnas):
+            cambios.append((
+                int(original['ID']),
+                str(editado['Usuario']).strip(),
+                str(editado['Nombre']).strip(),
+                editado['Rol'],
+                1 if editado['Activo'] else 0
+            ))
+    return cambios
+
+@medir_seccion("render: gestion_usuarios")
 def gestion_usuarios():
     """Interfaz de gestión de usuarios (solo para admin)"""
     st.header("👥 Gestión de Usuarios")
     
-    if st.session_state.user_data['rol'] != 'admin':
+    if rol_actual() != 'admin':
         st.error("❌ Solo los administradores pueden acceder a esta sección")
         return
     
+    # Una sola consulta por rerun, compartida por todas las pestañas
+    usuarios = obtener_usuarios()
+    
     tab1, tab2, tab3 = st.tabs(["📋 Lista de Usuarios", "➕ Crear Usuario", "🔑 Cambiar Contraseñas"])
     
     with tab1:
         st.subheader("Usuarios Registrados")
         
-        usuarios = obtener_usuarios()
         if not usuarios:
             st.info("No hay usuarios registrados")
-            return
-        
-        for usuario in usuarios:
-            user_id, username, nombre, rol, activo, fecha_creacion = usuario
+        else:
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                busqueda = st.text_input("🔍 Buscar por usuario o nombre", key="buscar_usuarios")
+            with col2:
+                por_pagina = st.selectbox("Usuarios por página", USUARIOS_POR_PAGINA, key="usuarios_por_pagina")
             
-            with st.container():
-                col1, col2, col3, col4 = st.columns([2, 2, 1, 1])
-                
-                with col1:
-                    st.write(f"**{nombre}**")
-                    st.write(f"Usuario: {username}")
-                
-                with col2:
-                    st.write(f"Rol: **{rol}**")
-                    estado = "🟢 Activo" if activo == 1 else "🔴 Inactivo"
-                    st.write(f"Estado: {estado}")
-                
-                with col3:
-                    st.write(f"Creado: {fecha_creacion[:10]}")
-                
-                with col4:
-                    with st.expander("Editar"):
-                        with st.form(f"editar_usuario_{user_id}"):
-                            nuevo_username = st.text_input("Usuario", value=username, key=f"user_{user_id}")
-                            nuevo_nombre = st.text_input("Nombre completo", value=nombre, key=f"name_{user_id}")
-                            nuevo_rol = st.selectbox("Rol", ["admin", "editor", "viewer"], 
-                                                   index=["admin", "editor", "viewer"].index(rol), 
-                                                   key=f"rol_{user_id}")
-                            nuevo_activo = st.selectbox("Estado", ["Activo", "Inactivo"],
-                                                      index=0 if activo == 1 else 1,
-                                                      key=f"activo_{user_id}")
-                            
-                            if st.form_submit_button("💾 Actualizar"):
-                                success, msg = actualizar_usuario(
-                                    user_id, nuevo_username, nuevo_nombre, nuevo_rol, 
-                                    1 if nuevo_activo == "Activo" else 0
-                                )
-                                if success:
-                                    st.success(msg)
-                                    st.rerun()
-                                else:
-                                    st.error(msg)
+            filtrados = filtrar_usuarios(usuarios, busqueda)
+            total_paginas = max(1, (len(filtrados) + por_pagina - 1) // por_pagina)
+            pagina = st.number_input("Página", min_value=1, max_value=total_paginas, value=1, step=1,
+                                     key=f"pagina_usuarios_{busqueda}_{por_pagina}")
+            inicio = (pagina - 1) * por_pagina
+            pagina_usuarios = filtrados[inicio:inicio + por_pagina]
+            
+            df_original = pd.DataFrame(
+                [(u[0], u[1], u[2], u[3], u[4] == 1, str(u[5])[:10]) for u in pagina_usuarios],
+                columns=['ID', 'Usuario', 'Nombre', 'Rol', 'Activo', 'Creado']
+            )
+            
+            with st.form("editar_usuarios"):
+                df_editado = st.data_editor(
+                    df_original,
+                    column_config={
+                        'ID': st.column_config.NumberColumn("ID", disabled=True),
+                        'Usuario': st.column_config.TextColumn("Usuario", required=True),
+                        'Nombre': st.column_config.TextColumn("Nombre completo", required=True),
+                        'Rol': st.column_config.SelectboxColumn("Rol", options=ROLES, required=True),
+                        'Activo': st.column_config.CheckboxColumn("Activo"),
+                        'Creado': st.column_config.TextColumn("Creado", disabled=True),
+                    },
+                    hide_index=True,
+                    use_container_width=True,
+                    key=f"editor_usuarios_{pagina}_{por_pagina}_{busqueda}"
+                )
                 
-                st.markdown("---")
+                if st.form_submit_button("💾 Guardar cambios"):
+                    cambios = detectar_cambios_usuarios(df_original, df_editado)
+                    if any(not c[1] or not c[2] for c in cambios):
+                        st.warning("⚠️ Usuario y nombre no pueden estar vacíos")
+                    else:
+                        success, msg = actualizar_usuarios_lote(cambios)
+                        if success and cambios:
+                            st.success(msg)
+                            st.rerun()
+                        elif success:
+                            st.info(msg)
+                        else:
+                            st.error(msg)
+            
+            st.caption(f"Mostrando {len(pagina_usuarios)} de {len(filtrados)} usuarios | Página {pagina} de {total_paginas}")
     
     with tab2:
         st.subheader("Crear Nuevo Usuario")
@@ -309,11 +688,18 @@ def gestion_usuarios():
     with tab3:
         st.subheader("Cambiar Contraseñas")
         
-        usuarios = obtener_usuarios()
         if usuarios:
+            # Buscar primero para no cargar miles de opciones en el selectbox
+            busqueda_pass = st.text_input("🔍 Buscar usuario", key="buscar_cambiar_pass")
+            candidatos = filtrar_usuarios(usuarios, busqueda_pass)[:USUARIOS_POR_PAGINA[-1]]
+            
+            if not candidatos:
+                st.info("No hay usuarios que coincidan con la búsqueda")
+                return
+            
             usuario_seleccionado = st.selectbox(
                 "Seleccionar usuario",
-                [f"{u[0]} - {u[1]} ({u[2]})" for u in usuarios],
+                [f"{u[0]} - {u[1]} ({u[2]})" for u in candidatos],
                 key="cambiar_pass"
             )
             
@@ -338,22 +724,577 @@ def gestion_usuarios():
                     else:
                         st.warning("⚠️ Completa ambos campos")
 
-# ==================== FUNCIONES DE ACTUALIZACIÓN MASIVA MEJORADAS ====================
-def conectar_db():
-    return sqlite3.connect(DB_FILE)
+# ==================== RESPALDOS ====================
+def crear_respaldo(motivo="manual", proteger=None):
+    """Crear un respaldo consistente en línea con la API de backup de SQLite"""
+    try:
+        os.makedirs(BACKUP_DIR, exist_ok=True)
+        nombre = f"peliculas_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{motivo}.db"
+        ruta = os.path.join(BACKUP_DIR, nombre)
+        temporal = ruta + ".tmp"
+        
+        origen = conectar_db()
+        destino = sqlite3.connect(temporal)
+        try:
+            # Copia por bloques de páginas: entre pasos los demás lectores y
+            # escritores siguen trabajando; si la BD cambia, SQLite reinicia la copia
+            origen.backup(destino, pages=BACKUP_PAGINAS_POR_PASO, sleep=BACKUP_PAUSA)
+        finally:
+            destino.close()
+            origen.close()
+        
+        # El archivo solo aparece con su nombre final cuando está completo
+        os.replace(temporal, ruta)
+        rotar_respaldos(proteger)
+        return True, f"✅ Respaldo creado: {nombre}", ruta
+    except Exception as e:
+        if 'temporal' in locals() and os.path.exists(temporal):
+            os.remove(temporal)
+        return False, f"❌ Error al crear respaldo: {e}", None
+
+def listar_respaldos():
+    """Listar respaldos del más reciente al más antiguo"""
+    if not os.path.isdir(BACKUP_DIR):
+        return []
+    respaldos = []
+    for nombre in os.listdir(BACKUP_DIR):
+        if nombre.startswith("peliculas_") and nombre.endswith(".db"):
+            ruta = os.path.join(BACKUP_DIR, nombre)
+            respaldos.append({
+                'nombre': nombre,
+                'motivo': nombre[:-len(".db")].split("_", 4)[-1],
+                'ruta': ruta,
+                'tamano': os.path.getsize(ruta),
+                'fecha': datetime.fromtimestamp(os.path.getmtime(ruta))
+            })
+    return sorted(respaldos, key=lambda r: r['nombre'], reverse=True)
+
+def rotar_respaldos(proteger=None):
+    """Eliminar los respaldos más antiguos que exceden la retención de su motivo.
+
+    Cada motivo (manual, antes_limpiar, antes_restaurar) tiene su propia cuota, así
+    que varias restauraciones seguidas no desplazan los respaldos manuales.
+    `proteger` es el nombre de un respaldo que no se borra (el que se está restaurando).
+    """
+    conservados = {}
+    for respaldo in listar_respaldos():
+        if respaldo['nombre'] == proteger:
+            continue
+        conservados[respaldo['motivo']] = conservados.get(respaldo['motivo'], 0) + 1
+        if conservados[respaldo['motivo']] > BACKUP_RETENCION:
+            os.remove(respaldo['ruta'])
+
+def restaurar_respaldo(nombre):
+    """Restaurar la base de datos desde un respaldo (se respalda el estado actual antes)"""
+    nombre = os.path.basename(nombre)
+    ruta = os.path.join(BACKUP_DIR, nombre)
+    try:
+        # Solo lectura: si el archivo no existe falla en vez de crear una BD vacía
+        origen = sqlite3.connect(f"file:{os.path.abspath(ruta)}?mode=ro", uri=True)
+        tablas = {fila[0] for fila in origen.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    except sqlite3.Error:
+        return False, "❌ Respaldo no encontrado o ilegible"
+    if not {'peliculas', 'usuarios'} <= tablas:
+        origen.close()
+        return False, "❌ El respaldo no contiene las tablas de películas y usuarios"
+    
+    success, msg, _ = crear_respaldo("antes_restaurar", proteger=nombre)
+    if not success:
+        origen.close()
+        return False, msg
+    
+    try:
+        destino = conectar_db()
+        try:
+            generacion = destino.execute("PRAGMA user_version").fetchone()[0]
+            # Restauración en un solo paso: la escritura en la BD activa se hace
+            # dentro del bloqueo de SQLite, sin reemplazar el archivo bajo los lectores
+            origen.backup(destino)
+            # La copia trae el user_version del respaldo; se avanza la generación
+            # para que otros procesos de la app detecten la restauración
+            destino.execute(f"PRAGMA user_version = {generacion + 1}")
+        finally:
+            destino.close()
+        reiniciar_caches()
+        return True, f"✅ Base de datos restaurada desde {nombre}"
+    except Exception as e:
+        return False, f"❌ Error al restaurar: {e}"
+    finally:
+        origen.close()
+
+@st.cache_resource
+def generacion_vista():
+    """Última generación de la BD (PRAGMA user_version) vista por este proceso"""
+    return {'valor': None, 'lock': threading.Lock()}
+
+def leer_generacion():
+    conn = sqlite3.connect(DB_FILE)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+def reiniciar_caches():
+    """Descartar las cachés en memoria derivadas del contenido de la BD"""
+    invalidar_autorizacion()
+    reiniciar_indice()
+    reiniciar_sugerencias()
+
+def verificar_generacion():
+    """Reiniciar las cachés si la BD fue restaurada desde otro proceso (p. ej. respaldos.py)"""
+    vista = generacion_vista()
+    generacion = leer_generacion()
+    with vista['lock']:
+        anterior, vista['valor'] = vista['valor'], generacion
+    if anterior is not None and anterior != generacion:
+        reiniciar_caches()
+
+# ==================== MANTENIMIENTO ====================
+@st.cache_resource
+def estado_mantenimiento():
+    """Estado del mantenimiento compartido por todas las sesiones del proceso"""
+    return {
+        'ultimo_optimize': None,
+        'ultimo_vacuum': None,
+        'ultimo_checkpoint': None,
+        'paginas_liberadas': 0,
+        'ultimo_error': None,
+        'lock': threading.Lock()
+    }
+
+# El hilo de mantenimiento no tiene ScriptRunContext, así que st.cache_resource le
+# devolvería objetos nuevos: recibe las métricas y el estado compartidos como argumentos.
+def registrar_mantenimiento(estado=None, **valores):
+    estado = estado_mantenimiento() if estado is None else estado
+    with estado['lock']:
+        estado.update(valores)
+
+def ultima_actividad(metricas=None):
+    """Timestamp de la última consulta registrada por la instrumentación"""
+    metricas = registro_metricas() if metricas is None else metricas
+    return metricas['ultima_actividad']
+
+def optimizar_db(completo=False):
+    """Actualizar estadísticas del planificador (sqlite_stat1) con ANALYZE completo o acotado"""
+    try:
+        conn = conectar_db()
+        # PRAGMA optimize en una conexión nueva solo mira las tablas consultadas en ella,
+        # así que no generaría estadísticas; el ANALYZE acotado muestrea cada índice
+        if not completo:
+            conn.execute(f"PRAGMA analysis_limit={ANALISIS_LIMITE}")
+        conn.execute("ANALYZE")
+        conn.close()
+        registrar_mantenimiento(ultimo_optimize=datetime.now())
+        return True, "✅ Estadísticas del planificador actualizadas"
+    except Exception as e:
+        registrar_mantenimiento(ultimo_error=str(e))
+        return False, f"❌ Error al optimizar: {e}"
+
+def optimizar_tras_carga(filas):
+    """Tras una carga o borrado grande, actualizar estadísticas del planificador"""
+    if filas >= MANTENIMIENTO_UMBRAL_FILAS:
+        optimizar_db()
+
+def vacuum_incremental(max_pasos=VACUUM_MAX_PASOS, solo_inactivo=False, metricas=None, estado=None):
+    """Liberar páginas libres en pasos acotados; se detiene si llega actividad nueva"""
+    # Conexión sin instrumentar para que el mantenimiento no cuente como actividad
+    conn = sqlite3.connect(DB_FILE, timeout=1)
+    try:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            return 0
+        inicio = time.time()
+        libres_inicio = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        for _ in range(max_pasos):
+            libres = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if libres == 0 or (solo_inactivo and ultima_actividad(metricas) > inicio):
+                break
+            # executescript recorre la sentencia completa; execute solo libera una página
+            conn.executescript(f"PRAGMA incremental_vacuum({VACUUM_PAGINAS_POR_PASO});")
+        liberadas = libres_inicio - conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if liberadas:
+            estado = estado_mantenimiento() if estado is None else estado
+            with estado['lock']:
+                estado['ultimo_vacuum'] = datetime.now()
+                estado['paginas_liberadas'] += liberadas
+        return liberadas
+    finally:
+        conn.close()
+
+def checkpoint_wal(modo="PASSIVE", estado=None):
+    """Volcar el WAL a la base de datos; PASSIVE no bloquea a lectores ni escritores"""
+    conn = sqlite3.connect(DB_FILE, timeout=1)
+    try:
+        resultado = conn.execute(f"PRAGMA wal_checkpoint({modo})").fetchone()
+        registrar_mantenimiento(estado, ultimo_checkpoint=datetime.now())
+        return resultado
+    finally:
+        conn.close()
+
+def convertir_auto_vacuum():
+    """Activar auto_vacuum=INCREMENTAL en una BD existente (requiere un VACUUM completo)"""
+    try:
+        conn = sqlite3.connect(DB_FILE)
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+        conn.close()
+        return True, "✅ Base de datos convertida a auto_vacuum incremental"
+    except Exception as e:
+        return False, f"❌ Error al convertir: {e}"
+
+def bucle_mantenimiento(metricas, estado):
+    while True:
+        time.sleep(MANTENIMIENTO_INTERVALO)
+        try:
+            if time.time() - ultima_actividad(metricas) >= MANTENIMIENTO_INACTIVIDAD:
+                vacuum_incremental(solo_inactivo=True, metricas=metricas, estado=estado)
+                checkpoint_wal(estado=estado)
+        except Exception as e:
+            registrar_mantenimiento(estado, ultimo_error=str(e))
+
+@st.cache_resource
+def iniciar_mantenimiento():
+    """Lanzar el hilo de mantenimiento en segundo plano (uno por proceso)"""
+    hilo = threading.Thread(target=bucle_mantenimiento, args=(registro_metricas(), estado_mantenimiento()),
+                            name="mantenimiento_db", daemon=True)
+    hilo.start()
+    return hilo
+
+def estadisticas_db():
+    """Tamaño del archivo, páginas libres y fragmentación de la base de datos"""
+    conn = sqlite3.connect(DB_FILE)
+    try:
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    finally:
+        conn.close()
+    wal = DB_FILE + "-wal"
+    return {
+        'tamano': os.path.getsize(DB_FILE),
+        'tamano_wal': os.path.getsize(wal) if os.path.exists(wal) else 0,
+        'page_size': page_size,
+        'page_count': page_count,
+        'freelist': freelist,
+        'fragmentacion': freelist / page_count * 100 if page_count else 0,
+        'auto_vacuum': {0: "NONE", 1: "FULL", 2: "INCREMENTAL"}.get(auto_vacuum, str(auto_vacuum)),
+        'journal_mode': journal_mode
+    }
+
+# ==================== DUPLICADOS ====================
+def plegar_texto(texto):
+    """Quitar acentos, pasar a minúsculas y colapsar espacios: 'Ciencia  Ficción' -> 'ciencia ficcion'"""
+    texto = str(texto)
+    if not texto.isascii():
+        texto = "".join(c for c in unicodedata.normalize('NFKD', texto) if not unicodedata.combining(c))
+    return " ".join(texto.lower().split())
+
+def normalizar_titulo(titulo):
+    """Plegar acentos, mayúsculas, puntuación y año final: 'El Señor (2001)' -> 'el senor'"""
+    texto = plegar_texto(titulo)
+    texto = re.sub(r"\(\s*\d{4}\s*\)\s*$", "", texto)
+    texto = re.sub(r"[^\w\s]", " ", texto)
+    return " ".join(texto.split())
+
+def trigramas(normalizado):
+    texto = f"  {normalizado} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+def claves_bloqueo(conjuntos):
+    """Claves LSH por bandas de las firmas MinHash de varios conjuntos de trigramas.
+
+    Las firmas se calculan con numpy por lotes; cada banda de MINHASH_FILAS valores
+    se combina en un solo entero, distinto por banda. Títulos parecidos comparten
+    al menos una clave.
+    """
+    claves = []
+    for inicio in range(0, len(conjuntos), LOTE_FIRMAS):
+        lote = conjuntos[inicio:inicio + LOTE_FIRMAS]
+        largos = np.fromiter(map(len, lote), dtype=np.intp, count=len(lote))
+        hashes = np.fromiter((hash(t) for trigs in lote for t in trigs), dtype=np.int64,
+                             count=int(largos.sum())).view(np.uint64)
+        posiciones = np.zeros(len(lote), dtype=np.intp)
+        np.cumsum(largos[:-1], out=posiciones[1:])
+        # Una fila por permutación: reduceat sobre el eje contiguo es varias veces más rápido
+        permutados = FACTORES_MINHASH[:, None] * hashes + DESPLAZAMIENTOS_MINHASH[:, None]
+        firmas = np.minimum.reduceat(permutados, posiciones, axis=1).T
+        bandas = (firmas.reshape(len(lote), MINHASH_BANDAS, MINHASH_FILAS) * MULTIPLICADORES_BANDA).sum(axis=2)
+        claves.extend((bandas + SALES_BANDA).tolist())
+    return claves
+
+def preparar_titulos(titulos):
+    """(título, normalizado, trigramas, claves) de cada título; None si queda vacío al normalizar"""
+    normalizados = [normalizar_titulo(titulo) for titulo in titulos]
+    # Trigramas y firmas una sola vez por título normalizado distinto
+    distintos = list(dict.fromkeys(n for n in normalizados if n))
+    trigs = [trigramas(n) for n in distintos]
+    datos = dict(zip(distintos, zip(trigs, claves_bloqueo(trigs))))
+    return [(titulo, normalizado) + datos[normalizado] if normalizado else None
+            for titulo, normalizado in zip(titulos, normalizados)]
+
+@contextmanager
+def sin_recolector():
+    """Pausar el recolector de ciclos mientras se crean millones de objetos del índice"""
+    activo = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if activo:
+            gc.enable()
+
+# Las cubetas guardan títulos normalizados distintos, no IDs: las copias de un mismo
+# título (muy comunes en catálogos grandes) no inflan las cubetas ni la búsqueda.
+def nuevo_indice():
+    return {'ultimo_id': 0, 'titulos': {}, 'grupos': {}, 'cubetas': {}, 'lock': threading.Lock()}
+
+def indexar_titulo(indice, clave, preparado):
+    titulo, normalizado, trigs, bloques = preparado
+    indice['titulos'][clave] = (titulo, normalizado)
+    grupo = indice['grupos'].get(normalizado)
+    if grupo is None:
+        grupo = indice['grupos'][normalizado] = {'clave': clave, 'trigs': trigs, 'claves': set()}
+        for bloque in bloques:
+            indice['cubetas'].setdefault(bloque, set()).add(normalizado)
+    grupo['claves'].add(clave)
+
+def buscar_similar(indice, preparado):
+    """Comparar contra los candidatos que comparten más bandas y devolver (clave, título, similitud)"""
+    _, normalizado, trigs, bloques = preparado
+    grupo = indice['grupos'].get(normalizado)
+    if grupo is not None:
+        return grupo['clave'], indice['titulos'][grupo['clave']][0], 1.0
+    
+    # La cantidad de bandas compartidas estima la similitud: se verifican primero los más parecidos
+    bandas_compartidas = Counter()
+    for bloque in bloques:
+        bandas_compartidas.update(indice['cubetas'].get(bloque, ()))
+    
+    mejor = None
+    for otro, _ in bandas_compartidas.most_common(DUPLICADOS_MAX_CANDIDATOS):
+        grupo = indice['grupos'][otro]
+        similitud = jaccard(trigs, grupo['trigs'])
+        if similitud >= DUPLICADOS_UMBRAL and (mejor is None or similitud > mejor[2]):
+            mejor = (grupo['clave'], indice['titulos'][grupo['clave']][0], similitud)
+    return mejor
+
+@st.cache_resource
+def indice_titulos():
+    """Índice de títulos del catálogo, construido una vez por proceso"""
+    return nuevo_indice()
 
+def sincronizar_indice(indice=None):
+    """Agregar al índice las películas con ID mayor al último indexado"""
+    indice = indice_titulos() if indice is None else indice
+    with indice['lock']:
+        conn = conectar_db()
+        c = conn.cursor()
+        c.execute(CONSULTAS['titulos_desde_id'], (indice['ultimo_id'],))
+        filas = c.fetchall()
+        conn.close()
+        if not filas:
+            return indice
+        with sin_recolector():
+            for (pelicula_id, _), preparado in zip(filas, preparar_titulos([nombre for _, nombre in filas])):
+                if preparado is not None:
+                    indexar_titulo(indice, pelicula_id, preparado)
+        indice['ultimo_id'] = filas[-1][0]
+        # El índice vive todo el proceso: se saca de las recolecciones futuras
+        gc.freeze()
+    return indice
+
+@st.cache_resource
+def precargar_indice():
+    """Construir el índice de títulos en segundo plano al iniciar, fuera de cualquier rerun"""
+    # El hilo no tiene ScriptRunContext: recibe el índice compartido como argumento
+    hilo = threading.Thread(target=sincronizar_indice, args=(indice_titulos(),),
+                            name="indice_titulos", daemon=True)
+    hilo.start()
+    return hilo
+
+def quitar_del_indice(pelicula_id):
+    indice = indice_titulos()
+    with indice['lock']:
+        entrada = indice['titulos'].pop(pelicula_id, None)
+        if entrada:
+            normalizado = entrada[1]
+            grupo = indice['grupos'][normalizado]
+            grupo['claves'].discard(pelicula_id)
+            if grupo['claves']:
+                if grupo['clave'] == pelicula_id:
+                    grupo['clave'] = next(iter(grupo['claves']))
+                return
+            del indice['grupos'][normalizado]
+            for bloque in claves_bloqueo([grupo['trigs']])[0]:
+                indice['cubetas'].get(bloque, set()).discard(normalizado)
+
+def reiniciar_indice():
+    """Vaciar el índice para reconstruirlo (tras limpiar la tabla o restaurar un respaldo)"""
+    indice = indice_titulos()
+    with indice['lock']:
+        indice.update(nuevo_indice(), lock=indice['lock'])
+
+def detectar_duplicados(titulos):
+    """Marcar títulos que probablemente ya existen en el catálogo o se repiten en el archivo"""
+    indice = sincronizar_indice()
+    en_archivo = nuevo_indice()
+    duplicados = []
+    
+    # Las firmas de todo el archivo se calculan en lote antes de tomar el lock del índice
+    with sin_recolector():
+        preparados = preparar_titulos(titulos)
+    with indice['lock']:
+        coincidencias = [buscar_similar(indice, p) if p is not None else None for p in preparados]
+    
+    for fila, (titulo, preparado, coincidencia) in enumerate(zip(titulos, preparados, coincidencias), start=1):
+        if preparado is None:
+            continue
+        origen = "Catálogo"
+        if coincidencia is None:
+            coincidencia = buscar_similar(en_archivo, preparado)
+            origen = "Archivo"
+        if coincidencia is not None:
+            clave, existente, similitud = coincidencia
+            duplicados.append({
+                'Fila': fila,
+                'Título': titulo,
+                'Coincide con': existente,
+                'Origen': f"{origen} (ID {clave})" if origen == "Catálogo" else f"{origen} (fila {clave})",
+                'Similitud': round(similitud, 3)
+            })
+        indexar_titulo(en_archivo, fila, preparado)
+    return duplicados
+
+# ==================== SUGERENCIAS ====================
+def nuevo_indice_sugerencias():
+    return {
+        'ultimo_id': 0,
+        'campos': {campo: {'claves': [], 'canonico': {}, 'cuentas': {}} for campo in CAMPOS_SUGERENCIAS},
+        'lock': threading.Lock()
+    }
+
+@st.cache_resource
+def indice_sugerencias():
+    """Índice de prefijos de valores distintos por campo, construido una vez por proceso"""
+    return nuevo_indice_sugerencias()
+
+# Las listas de claves nunca se modifican en su lugar: se construye una nueva y se
+# reemplaza la referencia, así sugerir() puede leerlas sin tomar el lock.
+def sincronizar_sugerencias():
+    """Agregar los valores de películas nuevas (ID mayor al último indexado)"""
+    indice = indice_sugerencias()
+    with indice['lock']:
+        conn = conectar_db()
+        c = conn.cursor()
+        c.execute(CONSULTAS['valores_desde_id'], (indice['ultimo_id'],))
+        filas = c.fetchall()
+        conn.close()
+        if not filas:
+            return indice
+        
+        for posicion, campo in enumerate(CAMPOS_SUGERENCIAS, start=1):
+            datos = indice['campos'][campo]
+            nuevos = []
+            for fila in filas:
+                valor = str(fila[posicion] or "").strip()
+                clave = plegar_texto(valor)
+                if not clave:
+                    continue
+                datos['cuentas'][clave] = datos['cuentas'].get(clave, 0) + 1
+                if clave not in datos['canonico']:
+                    datos['canonico'][clave] = valor
+                    nuevos.append((clave, valor))
+            if nuevos:
+                # Timsort aprovecha que la lista actual ya está ordenada
+                datos['claves'] = sorted(datos['claves'] + nuevos)
+        indice['ultimo_id'] = filas[-1][0]
+    return indice
+
+def quitar_sugerencias(pelicula_id, valores):
+    """Descontar los valores (nombre, genero, idioma, pais) de una película eliminada"""
+    indice = indice_sugerencias()
+    with indice['lock']:
+        # Una película aún no indexada no se contó; la próxima sincronización ya no la verá
+        if pelicula_id > indice['ultimo_id']:
+            return
+        for campo, valor in zip(CAMPOS_SUGERENCIAS, valores):
+            datos = indice['campos'][campo]
+            clave = plegar_texto(str(valor or "").strip())
+            if clave not in datos['cuentas']:
+                continue
+            datos['cuentas'][clave] -= 1
+            if datos['cuentas'][clave] == 0:
+                del datos['cuentas'][clave]
+                claves = list(datos['claves'])
+                del claves[bisect_left(claves, (clave, datos['canonico'].pop(clave)))]
+                datos['claves'] = claves
+
+def reiniciar_sugerencias():
+    """Vaciar el índice para reconstruirlo (tras limpiar la tabla o restaurar un respaldo)"""
+    indice = indice_sugerencias()
+    with indice['lock']:
+        indice.update(nuevo_indice_sugerencias(), lock=indice['lock'])
+
+def sugerir(campo, prefijo, k=SUGERENCIAS_MAX):
+    """Hasta k valores del campo que empiezan con el prefijo (sin distinguir acentos ni mayúsculas)"""
+    clave = plegar_texto(prefijo)
+    if not clave:
+        return []
+    claves = indice_sugerencias()['campos'][campo]['claves']
+    inicio = bisect_left(claves, (clave,))
+    resultado = []
+    for clave_valor, valor in claves[inicio:inicio + k]:
+        if not clave_valor.startswith(clave):
+            break
+        resultado.append(valor)
+    return resultado
+
+def valores_conocidos(campo):
+    """Todos los valores distintos del campo, en orden alfabético"""
+    return [valor for _, valor in indice_sugerencias()['campos'][campo]['claves']]
+
+def canonizar(campo, valor):
+    """Usar la grafía ya registrada del valor para no crear variantes con otros acentos o mayúsculas"""
+    valor = str(valor).strip()
+    return indice_sugerencias()['campos'][campo]['canonico'].get(plegar_texto(valor), valor)
+
+# ==================== FUNCIONES DE ACTUALIZACIÓN MASIVA MEJORADAS ====================
 def limpiar_tabla():
     """Solo admin puede limpiar la tabla"""
-    if st.session_state.user_data['rol'] != 'admin':
+    if rol_actual() != 'admin':
         return "❌ Solo los administradores pueden limpiar la tabla"
     
+    # Respaldo automático antes de borrar; si falla no se borra nada
+    success, msg, _ = crear_respaldo("antes_limpiar")
+    if not success:
+        return msg
+    
     conn = conectar_db()
     c = conn.cursor()
-    c.execute("DELETE FROM peliculas")
+    c.execute(CONSULTAS['limpiar_peliculas'])
+    borradas = c.rowcount
+    # Con la tabla vacía los IDs vuelven a empezar en 1
+    c.execute(CONSULTAS['reiniciar_secuencia_peliculas'])
     conn.commit()
     conn.close()
+    reiniciar_indice()
+    reiniciar_sugerencias()
+    optimizar_tras_carga(borradas)
     return "🗑️ Tabla limpiada correctamente"
 
+def campo_columna(col_name):
+    """Campo de película al que corresponde un encabezado de CSV (o None)"""
+    # Sin acentos ni mayúsculas: 'Género' y 'genero' son el mismo encabezado
+    col_lower = plegar_texto(col_name)
+    for campo, keywords in COLUMNAS_IMPORTACION.items():
+        if any(plegar_texto(keyword) in col_lower for keyword in keywords):
+            return campo
+    return None
+
 def importar_desde_csv(archivo_csv, usuario):
     """Importar datos desde archivo CSV - VERSIÓN MEJORADA"""
     try:
@@ -363,7 +1304,7 @@ def importar_desde_csv(archivo_csv, usuario):
         conn = conectar_db()
         c = conn.cursor()
         
-        registros_procesados = 0
+        nuevas = []
         errores = []
         
         for index, fila in df.iterrows():
@@ -379,19 +1320,19 @@ def importar_desde_csv(archivo_csv, usuario):
                 # Buscar en todas las columnas posibles
                 for col_name in df.columns:
                     col_value = str(fila[col_name]) if pd.notna(fila[col_name]) else ""
-                    col_lower = col_name.lower()
+                    campo = campo_columna(col_name)
                     
-                    if any(keyword in col_lower for keyword in ['nombre', 'name', 'title', 'pelicula', 'movie']):
+                    if campo == 'nombre':
                         nombre = col_value
-                    elif any(keyword in col_lower for keyword in ['genero', 'genre', 'categoria', 'category']):
+                    elif campo == 'genero':
                         genero = col_value
-                    elif any(keyword in col_lower for keyword in ['idioma', 'language', 'lenguaje']):
+                    elif campo == 'idioma':
                         idioma = col_value
-                    elif any(keyword in col_lower for keyword in ['traduccion', 'translation', 'subtitulos']):
+                    elif campo == 'traduccion':
                         traduccion = "Sí" if any(keyword in col_value.lower() for keyword in ['sí', 'si', 'yes', 'true', '1']) else "No"
-                    elif any(keyword in col_lower for keyword in ['fecha', 'date', 'año', 'year', 'estreno']):
+                    elif campo == 'fecha':
                         fecha = col_value
-                    elif any(keyword in col_lower for keyword in ['pais', 'country', 'origen', 'origin']):
+                    elif campo == 'pais':
                         pais = col_value
                 
                 # Validar datos esenciales
@@ -402,19 +1343,19 @@ def importar_desde_csv(archivo_csv, usuario):
                     idioma = idioma.strip() if idioma else "Desconocido"
                     pais = pais.strip() if pais else "Desconocido"
                     
-                    c.execute(
-                        "INSERT INTO peliculas (nombre, genero, idioma, traduccion, fecha, pais, usuario_creacion) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                        (nombre, genero, idioma, traduccion, fecha, pais, usuario)
-                    )
-                    registros_procesados += 1
+                    nuevas.append((nombre, genero, idioma, traduccion, fecha, pais, usuario))
                 else:
                     errores.append(f"Fila {index+1}: Datos insuficientes (nombre: '{nombre}', género: '{genero}')")
                     
             except Exception as e:
                 errores.append(f"Fila {index+1}: Error - {str(e)}")
         
+        # Un solo INSERT por lote: una entrada en las métricas en lugar de una por fila
+        c.executemany(CONSULTAS['insertar_pelicula'], nuevas)
         conn.commit()
         conn.close()
+        registros_procesados = len(nuevas)
+        optimizar_tras_carga(registros_procesados)
         
         return True, f"✅ {registros_procesados} registros importados correctamente", errores
         
@@ -424,7 +1365,7 @@ def importar_desde_csv(archivo_csv, usuario):
 def exportar_a_csv():
     try:
         conn = conectar_db()
-        df = pd.read_sql_query("SELECT * FROM peliculas", conn)
+        df = pd.read_sql_query(CONSULTAS['exportar_peliculas'], conn)
         conn.close()
         
         if df.empty:
@@ -436,10 +1377,11 @@ def exportar_a_csv():
     except Exception as e:
         return None, f"❌ Error en exportación: {str(e)}"
 
+@medir_seccion("render: actualizar_pelicula_masiva")
 def actualizar_pelicula_masiva():
     st.header("🔄 Herramientas de Actualización Masiva")
     
-    tab1, tab2, tab3, tab4 = st.tabs(["📤 Exportar CSV", "📥 Importar CSV", "🔄 Actualizar Rápido", "🗑️ Limpiar Datos"])
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["📤 Exportar CSV", "📥 Importar CSV", "🔄 Actualizar Rápido", "🗑️ Limpiar Datos", "💾 Respaldos"])
     
     with tab1:
         st.subheader("Exportar Datos a CSV")
@@ -458,18 +1400,18 @@ def actualizar_pelicula_masiva():
             else:
                 st.error(mensaje)
         
-        peliculas = obtener_peliculas()
+        peliculas = obtener_pagina_peliculas(10)
         if peliculas:
             st.subheader("📋 Vista Previa de Datos")
             df_preview = pd.DataFrame(peliculas, columns=['ID', 'Nombre', 'Género', 'Idioma', 'Traducción', 'Fecha', 'País', 'Fecha_Creacion', 'Usuario'])
-            st.dataframe(df_preview.head(10))
-            st.write(f"Total de películas en base de datos: {len(peliculas)}")
+            st.dataframe(df_preview)
+            st.write(f"Total de películas en base de datos: {contar_peliculas()}")
     
     with tab2:
         st.subheader("📥 Importar Datos desde CSV")
         
         # Verificar permisos
-        if st.session_state.user_data['rol'] not in ['admin', 'editor']:
+        if rol_actual() not in ['admin', 'editor']:
             st.error("❌ Solo administradores y editores pueden importar datos")
             return
         
@@ -488,6 +1430,7 @@ def actualizar_pelicula_masiva():
         if 'archivo_csv_cargado' not in st.session_state:
             st.session_state.archivo_csv_cargado = None
             st.session_state.df_preview = None
+            st.session_state.duplicados_preview = None
         
         # File uploader
         archivo_csv = st.file_uploader(
@@ -506,6 +1449,12 @@ def actualizar_pelicula_masiva():
                         st.session_state.archivo_csv_cargado = archivo_csv
                         # Leer el CSV para vista previa
                         st.session_state.df_preview = pd.read_csv(archivo_csv)
+                        # Posibles duplicados según la columna de nombre detectada
+                        columna_nombre = next((col for col in st.session_state.df_preview.columns
+                                               if campo_columna(col) == 'nombre'), None)
+                        st.session_state.duplicados_preview = detectar_duplicados(
+                            st.session_state.df_preview[columna_nombre].fillna("").astype(str)
+                        ) if columna_nombre else []
                         st.success("✅ Archivo cargado correctamente")
                         st.rerun()
                     except Exception as e:
@@ -525,6 +1474,12 @@ def actualizar_pelicula_masiva():
             
             st.write(f"**📊 Total de filas:** {len(st.session_state.df_preview)}")
             
+            duplicados = st.session_state.get('duplicados_preview') or []
+            if duplicados:
+                st.warning(f"🔁 {len(duplicados)} filas parecen duplicadas de películas existentes o de otras filas del archivo")
+                with st.expander("📋 Ver posibles duplicados"):
+                    st.dataframe(pd.DataFrame(duplicados), hide_index=True, use_container_width=True)
+            
             # Opciones de importación
             st.subheader("⚙️ Opciones de Importación")
             opciones_importacion = st.radio(
@@ -538,8 +1493,11 @@ def actualizar_pelicula_masiva():
                 with st.spinner("📤 Importando datos a la base de datos..."):
                     # Limpiar tabla si es necesario
                     if "Reemplazar" in opciones_importacion:
-                        if st.session_state.user_data['rol'] == 'admin':
+                        if rol_actual() == 'admin':
                             resultado_limpieza = limpiar_tabla()
+                            if resultado_limpieza.startswith("❌"):
+                                st.error(resultado_limpieza)
+                                return
                             st.info(resultado_limpieza)
                         else:
                             st.error("❌ Solo los administradores pueden reemplazar todos los datos")
@@ -567,6 +1525,7 @@ def actualizar_pelicula_masiva():
                         # Limpiar el estado después de importar exitosamente
                         st.session_state.archivo_csv_cargado = None
                         st.session_state.df_preview = None
+                        st.session_state.duplicados_preview = None
                     else:
                         st.error(mensaje)
                     
@@ -577,13 +1536,14 @@ def actualizar_pelicula_masiva():
             if st.button("🗑️ Limpiar Archivo Cargado"):
                 st.session_state.archivo_csv_cargado = None
                 st.session_state.df_preview = None
+                st.session_state.duplicados_preview = None
                 st.success("✅ Archivo eliminado de la memoria")
                 st.rerun()
     
     with tab3:
         st.subheader("🔄 Actualización Rápida por Texto")
         
-        if st.session_state.user_data['rol'] not in ['admin', 'editor']:
+        if rol_actual() not in ['admin', 'editor']:
             st.error("❌ Solo administradores y editores pueden agregar películas")
         else:
             st.write("""
@@ -597,6 +1557,9 @@ def actualizar_pelicula_masiva():
             ```
             """)
             
+            # Para usar la grafía ya registrada de género, idioma y país
+            sincronizar_sugerencias()
+            
             with st.form("agregar_rapido"):
                 datos_texto = st.text_area(
                     "Ingresa los datos (una película por línea):", 
@@ -610,7 +1573,7 @@ def actualizar_pelicula_masiva():
                         conn = conectar_db()
                         c = conn.cursor()
                         
-                        agregadas = 0
+                        nuevas = []
                         errores = []
                         
                         for i, linea in enumerate(lineas):
@@ -618,12 +1581,12 @@ def actualizar_pelicula_masiva():
                                 datos = [d.strip() for d in linea.split(';')]
                                 if len(datos) == 6:
                                     nombre, genero, idioma, traduccion, fecha, pais = datos
+                                    genero = canonizar('genero', genero)
+                                    idioma = canonizar('idioma', idioma)
+                                    pais = canonizar('pais', pais)
                                     if nombre and genero:
-                                        c.execute(
-                                            "INSERT INTO peliculas (nombre, genero, idioma, traduccion, fecha, pais, usuario_creacion) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                                            (nombre, genero, idioma, traduccion, fecha, pais, st.session_state.user_data['username'])
-                                        )
-                                        agregadas += 1
+                                        nuevas.append((nombre, genero, idioma, traduccion, fecha, pais,
+                                                       st.session_state.user_data['username']))
                                     else:
                                         errores.append(f"Línea {i+1}: Nombre y género requeridos")
                                 else:
@@ -632,10 +1595,11 @@ def actualizar_pelicula_masiva():
                             except Exception as e:
                                 errores.append(f"Línea {i+1}: {str(e)}")
                         
+                        c.executemany(CONSULTAS['insertar_pelicula'], nuevas)
                         conn.commit()
                         conn.close()
                         
-                        st.success(f"✅ {agregadas} películas agregadas correctamente")
+                        st.success(f"✅ {len(nuevas)} películas agregadas correctamente")
                         if errores:
                             st.warning(f"❌ {len(errores)} líneas con errores:")
                             for error in errores[:5]:
@@ -646,10 +1610,10 @@ def actualizar_pelicula_masiva():
     with tab4:
         st.subheader("🗑️ Herramientas de Limpieza")
         
-        if st.session_state.user_data['rol'] != 'admin':
+        if rol_actual() != 'admin':
             st.error("❌ Solo los administradores pueden acceder a esta sección")
         else:
-            st.warning("⚠️ Zona de peligro - Acciones no reversibles")
+            st.warning("⚠️ Zona de peligro - Se crea un respaldo automático antes de limpiar")
             
             col1, col2 = st.columns(2)
             
@@ -657,8 +1621,11 @@ def actualizar_pelicula_masiva():
                 if st.button("🧹 Limpiar Todos los Datos", type="primary"):
                     if st.checkbox("✅ Confirmar eliminación de TODOS los datos"):
                         mensaje = limpiar_tabla()
-                        st.success(mensaje)
-                        st.rerun()
+                        if mensaje.startswith("❌"):
+                            st.error(mensaje)
+                        else:
+                            st.success(mensaje)
+                            st.rerun()
             
             with col2:
                 if st.button("📊 Generar Datos de Ejemplo"):
@@ -672,7 +1639,7 @@ def actualizar_pelicula_masiva():
                     ]
                     
                     c.executemany(
-                        "INSERT INTO peliculas (nombre, genero, idioma, traduccion, fecha, pais, usuario_creacion) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        CONSULTAS['insertar_pelicula'],
                         ejemplos
                     )
                     conn.commit()
@@ -680,7 +1647,54 @@ def actualizar_pelicula_masiva():
                     st.success("✅ Películas de ejemplo agregadas")
                     st.rerun()
 
+    with tab5:
+        st.subheader("💾 Respaldos de la Base de Datos")
+        
+        if rol_actual() != 'admin':
+            st.error("❌ Solo los administradores pueden acceder a esta sección")
+        else:
+            st.info(f"Se conservan los últimos {BACKUP_RETENCION} respaldos de cada tipo en `{BACKUP_DIR}/`. "
+                    "Antes de limpiar la tabla o restaurar se crea uno automáticamente.")
+            
+            if st.button("💾 Crear Respaldo Ahora"):
+                with st.spinner("Creando respaldo..."):
+                    success, msg, _ = crear_respaldo()
+                if success:
+                    st.success(msg)
+                else:
+                    st.error(msg)
+            
+            respaldos = listar_respaldos()
+            if not respaldos:
+                st.info("📝 No hay respaldos disponibles")
+            else:
+                st.dataframe(
+                    pd.DataFrame(
+                        [(r['nombre'], r['fecha'].strftime('%Y-%m-%d %H:%M:%S'), f"{r['tamano'] / 1024:.1f} KB")
+                         for r in respaldos],
+                        columns=['Respaldo', 'Fecha', 'Tamaño']
+                    ),
+                    hide_index=True,
+                    use_container_width=True
+                )
+                
+                with st.form("restaurar_respaldo"):
+                    seleccionado = st.selectbox("Respaldo a restaurar", [r['nombre'] for r in respaldos])
+                    confirmar = st.checkbox("✅ Confirmar restauración (reemplaza los datos actuales)")
+                    
+                    if st.form_submit_button("♻️ Restaurar"):
+                        if confirmar:
+                            success, msg = restaurar_respaldo(seleccionado)
+                            if success:
+                                st.success(msg)
+                                st.rerun()
+                            else:
+                                st.error(msg)
+                        else:
+                            st.warning("⚠️ Confirma la restauración antes de continuar")
+
 # ==================== INTERFAZ PRINCIPAL MEJORADA ====================
+@medir_seccion("render: pagina_login")
 def pagina_login():
     st.title("🎬 Sistema de Gestión de Películas")
     st.subheader("Inicio de Sesión")
@@ -691,7 +1705,11 @@ def pagina_login():
         
         if st.form_submit_button("Entrar"):
             if user and pwd:
-                user_data = verificar_login(user, pwd)
+                try:
+                    user_data = verificar_login(user, pwd)
+                except sqlite3.Error as e:
+                    error_db(e)
+                    return
                 if user_data:
                     st.session_state.update({
                         'logged_in': True,
@@ -724,7 +1742,7 @@ def pagina_principal():
     
     # Navegación según el rol
     if user_data['rol'] == 'admin':
-        opciones = ["📊 Dashboard", "🎭 Ver Películas", "➕ Agregar Individual", "🔄 Actualización Masiva", "👥 Gestión de Usuarios"]
+        opciones = ["📊 Dashboard", "🎭 Ver Películas", "➕ Agregar Individual", "🔄 Actualización Masiva", "👥 Gestión de Usuarios", "⏱️ Rendimiento", "🧰 Mantenimiento"]
     elif user_data['rol'] == 'editor':
         opciones = ["📊 Dashboard", "🎭 Ver Películas", "➕ Agregar Individual", "🔄 Actualización Masiva"]
     else:  # viewer
@@ -742,12 +1760,38 @@ def pagina_principal():
         actualizar_pelicula_masiva()
     elif opcion == "👥 Gestión de Usuarios":
         gestion_usuarios()
+    elif opcion == "⏱️ Rendimiento":
+        mostrar_rendimiento()
+    elif opcion == "🧰 Mantenimiento":
+        mostrar_mantenimiento()
+
+@medir_seccion("datos: calcular_metricas_dashboard")
+def calcular_metricas_dashboard():
+    """Calcular las métricas principales del dashboard con una sola consulta de agregados"""
+    try:
+        conn = conectar_db()
+        c = conn.cursor()
+        c.execute(CONSULTAS['resumen_peliculas'])
+        total, generos, idiomas, con_traduccion = c.fetchone()
+        conn.close()
+    except sqlite3.Error as e:
+        error_db(e)
+        total = generos = idiomas = con_traduccion = 0
+    return {'total': total, 'generos': generos, 'idiomas': idiomas, 'con_traduccion': con_traduccion}
+
+def buscar_peliculas(peliculas, busqueda):
+    """Filtrar películas por nombre, género o país"""
+    busqueda = busqueda.lower()
+    return [p for p in peliculas if busqueda in str(p[1]).lower() or 
+            busqueda in str(p[2]).lower() or 
+            busqueda in str(p[6]).lower()]
 
+@medir_seccion("render: mostrar_dashboard")
 def mostrar_dashboard():
     st.header("📊 Dashboard")
     
-    peliculas = obtener_peliculas()
-    if not peliculas:
+    metricas = calcular_metricas_dashboard()
+    if not metricas['total']:
         st.info("📝 No hay películas registradas")
         return
     
@@ -755,20 +1799,17 @@ def mostrar_dashboard():
     st.subheader("📈 Métricas Principales")
     col1, col2, col3, col4 = st.columns(4)
     with col1: 
-        st.metric("Total Películas", len(peliculas))
+        st.metric("Total Películas", metricas['total'])
     with col2: 
-        generos = len(set(p[2] for p in peliculas))
-        st.metric("Géneros Diferentes", generos)
+        st.metric("Géneros Diferentes", metricas['generos'])
     with col3: 
-        idiomas = len(set(p[3] for p in peliculas))
-        st.metric("Idiomas", idiomas)
+        st.metric("Idiomas", metricas['idiomas'])
     with col4: 
-        con_traduccion = sum(1 for p in peliculas if p[4] == "Sí")
-        st.metric("Con Traducción", con_traduccion)
+        st.metric("Con Traducción", metricas['con_traduccion'])
     
     # Últimas películas
     st.subheader("🎬 Últimas Películas Agregadas")
-    for pelicula in peliculas[:5]:
+    for pelicula in obtener_pagina_peliculas(5):
         id_peli, nombre, genero, idioma, traduccion, fecha, pais, fecha_creacion, usuario = pelicula
         
         with st.container():
@@ -781,24 +1822,46 @@ def mostrar_dashboard():
                 st.write(f"👤 {usuario}")
             st.markdown("---")
 
+@medir_seccion("render: mostrar_peliculas")
 def mostrar_peliculas():
     st.header("🎭 Lista Completa de Películas")
     
-    peliculas = obtener_peliculas()
+    total = contar_peliculas()
     
-    if not peliculas:
+    if not total:
         st.info("📝 No hay películas registradas")
         return
     
-    # Búsqueda
-    busqueda = st.text_input("🔍 Buscar por nombre, género o país")
+    # Búsqueda con sugerencias por prefijo
+    sincronizar_sugerencias()
+    busqueda = st.text_input("🔍 Buscar por nombre, género o país", key="busqueda_peliculas")
     if busqueda:
-        peliculas = [p for p in peliculas if busqueda.lower() in str(p[1]).lower() or 
-                    busqueda.lower() in str(p[2]).lower() or 
-                    busqueda.lower() in str(p[6]).lower()]
+        sugerencias = [s for s in dict.fromkeys(
+            sugerir('nombre', busqueda) + sugerir('genero', busqueda) + sugerir('pais', busqueda)
+        ) if s != busqueda][:SUGERENCIAS_MAX]
+        if sugerencias:
+            columnas = st.columns(len(sugerencias))
+            for i, (columna, sugerencia) in enumerate(zip(columnas, sugerencias)):
+                with columna:
+                    st.button(sugerencia, key=f"sugerencia_{i}", on_click=elegir_sugerencia,
+                              args=("busqueda_peliculas", sugerencia))
+        # La búsqueda por subcadena sí necesita todo el catálogo
+        peliculas = buscar_peliculas(obtener_peliculas(), busqueda)
+        total = len(peliculas)
+    
+    # Paginación: solo se renderiza una página de películas por rerun
+    total_paginas = max(1, (total + PELICULAS_POR_PAGINA - 1) // PELICULAS_POR_PAGINA)
+    pagina = st.number_input("Página", min_value=1, max_value=total_paginas, value=1, step=1,
+                             key=f"pagina_peliculas_{busqueda}")
+    inicio = (pagina - 1) * PELICULAS_POR_PAGINA
+    if busqueda:
+        pagina_peliculas = peliculas[inicio:inicio + PELICULAS_POR_PAGINA]
+    else:
+        # Sin búsqueda solo se leen las filas de la página
+        pagina_peliculas = obtener_pagina_peliculas(PELICULAS_POR_PAGINA, inicio)
     
     # Mostrar películas con opción de eliminar
-    for pelicula in peliculas:
+    for pelicula in pagina_peliculas:
         id_peli, nombre, genero, idioma, traduccion, fecha, pais, fecha_creacion, usuario = pelicula
         
         with st.container():
@@ -828,23 +1891,39 @@ def mostrar_peliculas():
             
             st.markdown("---")
     
-    st.info(f"📊 Mostrando {len(peliculas)} películas")
+    st.info(f"📊 Mostrando {len(pagina_peliculas)} de {total} películas | Página {pagina} de {total_paginas}")
+
+def elegir_sugerencia(key, valor):
+    st.session_state[key] = valor
 
+def campo_con_sugerencias(label, campo):
+    """Selector con los valores ya registrados (filtra mientras se escribe) y texto libre para uno nuevo"""
+    col1, col2 = st.columns(2)
+    with col1:
+        existente = st.selectbox(label, [""] + valores_conocidos(campo)[:SUGERENCIAS_OPCIONES_MAX],
+                                 key=f"sugerencias_{campo}")
+    with col2:
+        nuevo = st.text_input("o escribe uno nuevo", key=f"nuevo_{campo}")
+    return nuevo.strip() or existente
+
+@medir_seccion("render: agregar_pelicula_form")
 def agregar_pelicula_form():
     st.header("➕ Agregar Película Individual")
     
     # Verificar permisos
-    if st.session_state.user_data['rol'] not in ['admin', 'editor']:
+    if rol_actual() not in ['admin', 'editor']:
         st.error("❌ Solo administradores y editores pueden agregar películas")
         return
     
+    sincronizar_sugerencias()
+    
     with st.form("agregar_pelicula"):
         nombre = st.text_input("Nombre de la película*")
-        genero = st.text_input("Género*")
-        idioma = st.text_input("Idioma Original*")
+        genero = campo_con_sugerencias("Género*", 'genero')
+        idioma = campo_con_sugerencias("Idioma Original*", 'idioma')
         traduccion = st.selectbox("Traducción Disponible*", ["Sí", "No"])
         fecha = st.date_input("Fecha de Estreno*")
-        pais = st.text_input("País de Origen*")
+        pais = campo_con_sugerencias("País de Origen*", 'pais')
         
         if st.form_submit_button("✅ Agregar Película"):
             if all([nombre, genero, idioma, pais]):
@@ -860,18 +1939,183 @@ def agregar_pelicula_form():
             else:
                 st.warning("⚠️ Completa todos los campos obligatorios (*)")
 
-def main():
-    if 'logged_in' not in st.session_state:
-        st.session_state.logged_in = False
+def resumen_latencias(df, columna):
+    """Agrupar métricas por columna con conteo y percentiles p50/p95"""
+    agrupado = df.groupby(columna)['duracion_ms']
+    resumen = pd.DataFrame({
+        'Ejecuciones': agrupado.count(),
+        'p50 (ms)': agrupado.quantile(0.5),
+        'p95 (ms)': agrupado.quantile(0.95),
+        'Máx (ms)': agrupado.max(),
+        'Total (ms)': agrupado.sum()
+    })
+    return resumen.sort_values('p95 (ms)', ascending=False).round(2)
+
+def exportar_metricas():
+    """Agregar las métricas actuales al archivo local de métricas (JSON por línea)"""
+    metricas = registro_metricas()
+    with metricas['lock']:
+        consultas = list(metricas['consultas'])
+        secciones = list(metricas['secciones'])
+    try:
+        with open(METRICAS_FILE, 'a', encoding='utf-8') as f:
+            for entrada in consultas:
+                f.write(json.dumps({'tipo': 'consulta', **entrada}, ensure_ascii=False) + "\n")
+            for entrada in secciones:
+                f.write(json.dumps({'tipo': 'seccion', **entrada}, ensure_ascii=False) + "\n")
+        return True, f"✅ {len(consultas) + len(secciones)} métricas exportadas a {METRICAS_FILE}"
+    except Exception as e:
+        return False, f"❌ Error al exportar métricas: {e}"
+
+@medir_seccion("render: mostrar_rendimiento")
+def mostrar_rendimiento():
+    st.header("⏱️ Rendimiento")
+    
+    if rol_actual() != 'admin':
+        st.error("❌ Solo los administradores pueden acceder a esta sección")
+        return
+    
+    metricas = registro_metricas()
+    with metricas['lock']:
+        df_consultas = pd.DataFrame(list(metricas['consultas']))
+        df_secciones = pd.DataFrame(list(metricas['secciones']))
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("💾 Exportar a archivo de métricas"):
+            success, msg = exportar_metricas()
+            if success:
+                st.success(msg)
+            else:
+                st.error(msg)
+    with col2:
+        if st.button("🧹 Reiniciar métricas"):
+            with metricas['lock']:
+                metricas['consultas'].clear()
+                metricas['secciones'].clear()
+            st.rerun()
     
-    if not init_database():
-        st.error("❌ Error crítico: No se pudieron inicializar las bases de datos")
+    if df_consultas.empty and df_secciones.empty:
+        st.info("📝 Aún no hay métricas registradas")
         return
     
-    if not st.session_state.logged_in:
-        pagina_login()
-    else:
-        pagina_principal()
+    if not df_consultas.empty:
+        st.subheader("🗄️ Consultas SQL")
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Consultas", len(df_consultas))
+        with col2:
+            st.metric("p50", f"{df_consultas['duracion_ms'].quantile(0.5):.2f} ms")
+        with col3:
+            st.metric("p95", f"{df_consultas['duracion_ms'].quantile(0.95):.2f} ms")
+        with col4:
+            st.metric("Errores", int(df_consultas['error'].notna().sum()))
+        
+        st.write("**Latencia por consulta**")
+        resumen = resumen_latencias(df_consultas, 'consulta')
+        resumen['Filas (prom.)'] = df_consultas.groupby('consulta')['filas'].mean().round(1)
+        st.dataframe(resumen, use_container_width=True)
+        
+        st.write("**🐢 Consultas más lentas**")
+        lentas = df_consultas.nlargest(10, 'duracion_ms').copy()
+        lentas['timestamp'] = pd.to_datetime(lentas['timestamp'], unit='s')
+        st.dataframe(lentas.round(2), hide_index=True, use_container_width=True)
+    
+    if not df_secciones.empty:
+        st.subheader("🔄 Costo por rerun y por página")
+        st.dataframe(resumen_latencias(df_secciones, 'seccion'), use_container_width=True)
+
+@medir_seccion("render: mostrar_mantenimiento")
+def mostrar_mantenimiento():
+    st.header("🧰 Mantenimiento de la Base de Datos")
+    
+    if rol_actual() != 'admin':
+        st.error("❌ Solo los administradores pueden acceder a esta sección")
+        return
+    
+    try:
+        stats = estadisticas_db()
+    except Exception as e:
+        st.error(f"❌ Error al leer estadísticas: {e}")
+        return
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Tamaño del archivo", f"{stats['tamano'] / 1024 / 1024:.2f} MB")
+    with col2:
+        st.metric("Tamaño del WAL", f"{stats['tamano_wal'] / 1024 / 1024:.2f} MB")
+    with col3:
+        st.metric("Páginas libres", f"{stats['freelist']} de {stats['page_count']}")
+    with col4:
+        st.metric("Fragmentación", f"{stats['fragmentacion']:.1f} %")
+    
+    st.write(f"**auto_vacuum:** {stats['auto_vacuum']} | **journal_mode:** {stats['journal_mode']} | "
+             f"**page_size:** {stats['page_size']} bytes")
+    
+    estado = estado_mantenimiento()
+    formato = lambda f: f.strftime('%Y-%m-%d %H:%M:%S') if f else "nunca"
+    st.write(f"**Último optimize:** {formato(estado['ultimo_optimize'])} | "
+             f"**Último vacuum incremental:** {formato(estado['ultimo_vacuum'])} | "
+             f"**Último checkpoint:** {formato(estado['ultimo_checkpoint'])} | "
+             f"**Páginas liberadas:** {estado['paginas_liberadas']}")
+    if estado['ultimo_error']:
+        st.warning(f"⚠️ Último error de mantenimiento: {estado['ultimo_error']}")
+    
+    if stats['auto_vacuum'] != "INCREMENTAL":
+        st.warning("⚠️ Esta base de datos se creó sin auto_vacuum incremental. "
+                   "La conversión requiere un VACUUM completo que bloquea la BD mientras dura.")
+        if st.button("🔁 Convertir a auto_vacuum incremental"):
+            with st.spinner("Ejecutando VACUUM..."):
+                success, msg = convertir_auto_vacuum()
+            if success:
+                st.success(msg)
+                st.rerun()
+            else:
+                st.error(msg)
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        if st.button("📈 Actualizar estadísticas (ANALYZE)"):
+            success, msg = optimizar_db(completo=True)
+            if success:
+                st.success(msg)
+            else:
+                st.error(msg)
+    with col2:
+        if st.button("🧹 Vacuum incremental"):
+            try:
+                st.success(f"✅ {vacuum_incremental()} páginas liberadas")
+            except Exception as e:
+                st.error(f"❌ Error: {e}")
+    with col3:
+        if st.button("📝 Checkpoint del WAL"):
+            try:
+                _, paginas_wal, paginas_copiadas = checkpoint_wal("TRUNCATE")
+                st.success(f"✅ Checkpoint completado ({paginas_copiadas} de {paginas_wal} páginas)")
+            except Exception as e:
+                st.error(f"❌ Error: {e}")
+
+def main():
+    with medir_seccion("rerun"):
+        if 'logged_in' not in st.session_state:
+            st.session_state.logged_in = False
+        
+        with medir_seccion("init"):
+            if not init_database():
+                st.error("❌ Error crítico: No se pudieron inicializar las bases de datos")
+                return
+            iniciar_mantenimiento()
+            precargar_indice()
+            verificar_generacion()
+        
+        # Reflejar cambios de rol o desactivaciones hechos por un admin
+        if st.session_state.logged_in and not revalidar_sesion():
+            st.warning("⚠️ Tu sesión fue cerrada porque tu usuario cambió o fue desactivado")
+        
+        if not st.session_state.logged_in:
+            pagina_login()
+        else:
+            pagina_principal()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,231 @@
+"""Benchmarks de app.py con un catálogo sintético.
+
+Uso:
+    python benchmark.py --filas 10000 100000 --repeticiones 3
+
+Cada medición se agrega como una línea JSON a bench_results.jsonl para poder
+comparar ejecuciones en el tiempo.
+"""
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import app
+
+RESULTADOS_FILE = "bench_results.jsonl"
+USUARIO_BENCH = "bench"
+
+# Valores con distribución sesgada: los primeros aparecen mucho más que los últimos
+GENEROS = ["Drama", "Comedia", "Acción", "Thriller", "Terror", "Ciencia Ficción", "Animación",
+           "Fantasía", "Documental", "Romance", "Aventura", "Musical", "Western", "Noir", "Bélica"]
+IDIOMAS = ["Inglés", "Español", "Francés", "Japonés", "Coreano", "Alemán", "Italiano", "Hindi",
+           "Portugués", "Mandarín", "Sueco", "Ruso", "Árabe", "Turco", "Polaco"]
+PAISES = ["USA", "España", "México", "Francia", "Reino Unido", "Japón", "Corea del Sur", "India",
+          "Argentina", "Alemania", "Italia", "Brasil", "China", "Suecia", "Colombia", "Chile"]
+
+PALABRAS_TITULO = ["El", "La", "Los", "Noche", "Sombra", "Laberinto", "Señor", "Anillos", "Ciudad",
+                   "Última", "Guerra", "Amor", "Silencio", "Camino", "Fauno", "Río", "Memoria",
+                   "Corazón", "Tiempo", "Estrella", "Dragón", "Invierno", "Secreto", "Viaje",
+                   "Return", "Dark", "Night", "City", "Lost", "Star", "King", "Dream", "Parasite"]
+
+# Variantes de encabezado que reconoce importar_desde_csv
+ENCABEZADOS = {
+    'nombre': ["nombre", "Nombre", "Title", "Movie Name", "pelicula", "name"],
+    'genero': ["genero", "Género", "Genre", "categoria", "Category"],
+    'idioma': ["idioma", "Language", "Original Language", "lenguaje"],
+    'traduccion': ["traduccion", "Translation", "subtitulos"],
+    'fecha': ["fecha", "Release Date", "estreno", "Año", "year"],
+    'pais': ["pais", "Country", "origen", "Country of Origin"],
+}
+
+
+def pesos_zipf(n, s=1.2):
+    return [1 / (rango ** s) for rango in range(1, n + 1)]
+
+
+def fecha_desordenada(rnd):
+    """Fecha en un formato aleatorio, a veces vacía o inválida"""
+    d = date(1920, 1, 1) + timedelta(days=rnd.randrange(105 * 365))
+    formato = rnd.random()
+    if formato < 0.55:
+        return d.isoformat()
+    if formato < 0.70:
+        return d.strftime("%d/%m/%Y")
+    if formato < 0.80:
+        return str(d.year)
+    if formato < 0.88:
+        return d.strftime("%b %Y")
+    if formato < 0.95:
+        return ""
+    return rnd.choice(["N/A", "desconocida", "0000-00-00", "31/02/1999"])
+
+
+def variar_titulo(titulo, rnd):
+    """Duplicado con variaciones de mayúsculas, acentos o año"""
+    variante = rnd.random()
+    if variante < 0.3:
+        return titulo.lower()
+    if variante < 0.5:
+        return titulo.translate(str.maketrans("áéíóúñÁÉÍÓÚÑ", "aeiounAEIOUN"))
+    if variante < 0.7:
+        return f"{titulo} ({rnd.randint(1950, 2024)})"
+    return titulo
+
+
+def generar_peliculas(n, semilla=42):
+    """Generar n filas (nombre, genero, idioma, traduccion, fecha, pais) con datos realistas"""
+    rnd = random.Random(semilla)
+    pesos_genero = pesos_zipf(len(GENEROS))
+    pesos_idioma = pesos_zipf(len(IDIOMAS), 1.6)
+    pesos_pais = pesos_zipf(len(PAISES), 1.4)
+    titulos = []
+
+    for _ in range(n):
+        if titulos and rnd.random() < 0.08:
+            nombre = variar_titulo(rnd.choice(titulos), rnd)
+        else:
+            nombre = " ".join(rnd.choices(PALABRAS_TITULO, k=rnd.randint(1, 4)))
+            if rnd.random() < 0.3:
+                nombre += f" {rnd.randint(2, 9)}"
+            if len(titulos) < 50000:
+                titulos.append(nombre)
+
+        yield (
+            nombre,
+            rnd.choices(GENEROS, pesos_genero)[0],
+            rnd.choices(IDIOMAS, pesos_idioma)[0] if rnd.random() > 0.03 else "",
+            rnd.choice(["Sí", "No", "si", "yes", "No", "0", "1", ""]),
+            fecha_desordenada(rnd),
+            rnd.choices(PAISES, pesos_pais)[0] if rnd.random() > 0.03 else "",
+        )
+
+
+def escribir_csv(ruta, n, semilla=42):
+    """Escribir un CSV con encabezados variados compatibles con el importador"""
+    rnd = random.Random(semilla + 1)
+    campos = ['nombre', 'genero', 'idioma', 'traduccion', 'fecha', 'pais']
+    with open(ruta, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow([rnd.choice(ENCABEZADOS[campo]) for campo in campos])
+        writer.writerows(generar_peliculas(n, semilla))
+
+
+def poblar_db(n, semilla=42):
+    """Cargar n películas directamente en la base de datos actual"""
+    conn = sqlite3.connect(app.DB_FILE)
+    with conn:
+        conn.execute(app.CONSULTAS['limpiar_peliculas'])
+        conn.executemany(
+            app.CONSULTAS['insertar_pelicula'],
+            ((*fila, USUARIO_BENCH) for fila in generar_peliculas(n, semilla))
+        )
+    conn.close()
+
+
+def cronometrar(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+def version_git():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def ejecutar(filas, repeticiones, semilla, directorio):
+    """Medir los caminos principales de app.py para un catálogo de `filas` películas"""
+    app.DB_FILE = os.path.join(directorio, f"bench_{filas}.db")
+    if os.path.exists(app.DB_FILE):
+        os.remove(app.DB_FILE)
+    app.init_database()
+
+    resultados = {}
+
+    ruta_csv = os.path.join(directorio, f"bench_{filas}.csv")
+    escribir_csv(ruta_csv, filas, semilla)
+    resultados['importar_desde_csv'] = cronometrar(
+        lambda: app.importar_desde_csv(ruta_csv, USUARIO_BENCH), 1)
+    # Un encabezado no reconocido rechaza todas las filas y la medición no serviría
+    conn = sqlite3.connect(app.DB_FILE)
+    importadas = conn.execute("SELECT COUNT(*) FROM peliculas WHERE usuario_creacion=?",
+                              (USUARIO_BENCH,)).fetchone()[0]
+    conn.close()
+    if importadas != filas:
+        raise RuntimeError(f"importar_desde_csv cargó {importadas} de {filas} filas")
+
+    poblar_db(filas, semilla)
+    resultados['exportar_a_csv'] = cronometrar(app.exportar_a_csv, repeticiones)
+    resultados['obtener_peliculas'] = cronometrar(app.obtener_peliculas, repeticiones)
+
+    peliculas = app.obtener_peliculas()
+    terminos = ["noche", "drama", "corea", "zzz"]
+    resultados['buscar_peliculas'] = cronometrar(
+        lambda: [app.buscar_peliculas(peliculas, t) for t in terminos], repeticiones)
+    resultados['calcular_metricas_dashboard'] = cronometrar(app.calcular_metricas_dashboard, repeticiones)
+    resultados['obtener_pagina_peliculas'] = cronometrar(
+        lambda: app.obtener_pagina_peliculas(app.PELICULAS_POR_PAGINA, len(peliculas) // 2), repeticiones)
+
+    # Las películas son del usuario de benchmark, así que no se consulta la sesión
+    ids = random.Random(semilla).sample([p[0] for p in peliculas], min(100, len(peliculas)))
+    resultados['eliminar_pelicula'] = [
+        t / len(ids) for t in cronometrar(
+            lambda: [app.eliminar_pelicula(i, USUARIO_BENCH) for i in ids], 1)
+    ]
+
+    os.remove(ruta_csv)
+    os.remove(app.DB_FILE)
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de app.py con datos sintéticos")
+    parser.add_argument("--filas", type=int, nargs="+", default=[10000, 100000],
+                        help="tamaños de catálogo a medir (10k a 5M)")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--salida", default=RESULTADOS_FILE)
+    parser.add_argument("--directorio", default=None,
+                        help="directorio para la BD y CSV temporales")
+    args = parser.parse_args()
+
+    contexto = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'commit': version_git(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+    }
+
+    with tempfile.TemporaryDirectory(dir=args.directorio) as directorio:
+        for filas in args.filas:
+            resultados = ejecutar(filas, args.repeticiones, args.semilla, directorio)
+            with open(args.salida, 'a', encoding='utf-8') as f:
+                for operacion, tiempos in resultados.items():
+                    registro = {
+                        **contexto,
+                        'filas': filas,
+                        'operacion': operacion,
+                        'mejor_s': min(tiempos),
+                        'media_s': sum(tiempos) / len(tiempos),
+                        'tiempos_s': tiempos,
+                    }
+                    f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+                    print(f"{filas:>9} filas | {operacion:<28} | mejor {min(tiempos):.4f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""Prueba de carga de app.py con sesiones concurrentes usando AppTest.
+
+Uso:
+    python carga.py --viewers 8 --editores 4 --iteraciones 10 --filas 10000
+
+Cada sesión simulada ejecuta app.py sin navegador mediante
+streamlit.testing.v1.AppTest, en su propio proceso, contra una base de datos
+temporal compartida.
+Se reportan la distribución de latencia por acción, los errores de bloqueo
+de SQLite y el throughput total.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+import uuid
+
+from streamlit.testing.v1 import AppTest
+
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+PASSWORD_CARGA = "carga123"
+TERMINOS_BUSQUEDA = ["noche", "drama", "corea", "amor", "usa", "zzz"]
+REINTENTOS_NAVEGACION = 5
+
+
+class Registro:
+    """Latencias y errores de una sesión simulada.
+
+    Los errores de la app (excepciones y st.error) se cuentan aparte de las
+    excepciones que lanza el propio AppTest al ejecutar el script.
+    """
+
+    def __init__(self):
+        self.latencias = {}
+        self.errores = {}
+        self.errores_bloqueo = 0
+        self.errores_harness = {}
+
+    def medir(self, accion, at, timeout):
+        inicio = time.perf_counter()
+        try:
+            at.run(timeout=timeout)
+        except Exception as e:
+            # Falla del harness (p. ej. KeyError('client_state') de AppTest tras st.rerun())
+            clave = f"{type(e).__name__}: {e}"
+            self.errores_harness[clave] = self.errores_harness.get(clave, 0) + 1
+            # El árbol de elementos quedó del rerun anterior: no se revisan sus mensajes
+            self.latencias.setdefault(accion, []).append(time.perf_counter() - inicio)
+            return at
+        duracion = time.perf_counter() - inicio
+
+        # Excepciones no capturadas y errores reales que la app muestra con st.error;
+        # los avisos de permisos ("❌ Solo los administradores...") no son fallas
+        mensajes = [str(e.value) for e in at.exception]
+        mensajes += [str(e.value) for e in at.error if es_falla(str(e.value))]
+
+        self.latencias.setdefault(accion, []).append(duracion)
+        for mensaje in mensajes:
+            self.errores[accion] = self.errores.get(accion, 0) + 1
+            if es_bloqueo(mensaje):
+                self.errores_bloqueo += 1
+        return at
+
+    def resultado(self):
+        return {'latencias': self.latencias, 'errores': self.errores, 'errores_bloqueo': self.errores_bloqueo,
+                'errores_harness': self.errores_harness}
+
+
+def es_bloqueo(mensaje):
+    return "locked" in mensaje or "busy" in mensaje
+
+
+def es_falla(mensaje):
+    return "Error" in mensaje or es_bloqueo(mensaje)
+
+
+def boton(at, label=None, prefijo_key=None):
+    for b in at.button:
+        if label is not None and b.label == label:
+            return b
+        if prefijo_key is not None and b.key and b.key.startswith(prefijo_key):
+            return b
+    return None
+
+
+def navegacion(at):
+    return next((r for r in at.radio if r.label == "Navegación"), None)
+
+
+def iniciar_sesion(at, registro, username, timeout):
+    registro.medir("cargar", at, timeout)
+    at.text_input[0].input(username)
+    at.text_input[1].input(PASSWORD_CARGA)
+    boton(at, "Entrar").click()
+    registro.medir("login", at, timeout)
+    # El st.rerun() tras el login puede cortar la ejecución en AppTest; se vuelve a
+    # ejecutar hasta que aparezca la página principal
+    for _ in range(REINTENTOS_NAVEGACION):
+        if navegacion(at) is not None:
+            return at
+        registro.medir("login (reintento)", at, timeout)
+    if navegacion(at) is None:
+        raise RuntimeError(f"sin menú de navegación tras {REINTENTOS_NAVEGACION} reintentos de login")
+    return at
+
+
+def ir_a(at, registro, pagina, timeout):
+    menu = navegacion(at)
+    if menu is None:
+        raise RuntimeError("no se encontró el menú de navegación")
+    menu.set_value(pagina)
+    return registro.medir(f"navegar {pagina}", at, timeout)
+
+
+def buscar(at, registro, termino, timeout):
+    caja = next(t for t in at.text_input if t.label == "🔍 Buscar por nombre, género o país")
+    caja.input(termino)
+    return registro.medir("buscar", at, timeout)
+
+
+def paginar(at, registro, rnd, timeout):
+    paginador = next((n for n in at.number_input if n.key and n.key.startswith("pagina_peliculas")), None)
+    if paginador is None or paginador.max is None or paginador.max <= 1:
+        return at
+    paginador.set_value(rnd.randint(1, int(paginador.max)))
+    return registro.medir("paginar", at, timeout)
+
+
+def sesion_viewer(username, iteraciones, registro, timeout, semilla):
+    """Viewer: login, recorrer páginas y buscar"""
+    rnd = random.Random(semilla)
+    at = AppTest.from_file(APP_FILE, default_timeout=timeout)
+    iniciar_sesion(at, registro, username, timeout)
+    ir_a(at, registro, "🎭 Ver Películas", timeout)
+    for _ in range(iteraciones):
+        paginar(at, registro, rnd, timeout)
+        buscar(at, registro, rnd.choice(TERMINOS_BUSQUEDA), timeout)
+        buscar(at, registro, "", timeout)
+
+
+def sesion_editor(username, iteraciones, registro, timeout, semilla):
+    """Editor: login, importar por texto, buscar lo importado y eliminarlo"""
+    rnd = random.Random(semilla)
+    at = AppTest.from_file(APP_FILE, default_timeout=timeout)
+    iniciar_sesion(at, registro, username, timeout)
+    for _ in range(iteraciones):
+        # AppTest no soporta file_uploader, se importa con la actualización rápida por texto
+        ir_a(at, registro, "🔄 Actualización Masiva", timeout)
+        etiqueta = uuid.uuid4().hex[:8]
+        lineas = [f"Carga {etiqueta} {i};Drama;Español;Sí;2020-01-01;España" for i in range(rnd.randint(1, 20))]
+        at.text_area[0].input("\n".join(lineas))
+        boton(at, "➕ Agregar Películas").click()
+        registro.medir("importar", at, timeout)
+
+        ir_a(at, registro, "🎭 Ver Películas", timeout)
+        paginar(at, registro, rnd, timeout)
+        buscar(at, registro, etiqueta, timeout)
+        eliminar = boton(at, prefijo_key="del_")
+        if eliminar is not None:
+            eliminar.click()
+            registro.medir("eliminar", at, timeout)
+        buscar(at, registro, "", timeout)
+
+
+def ejecutar_sesion(tipo, username, iteraciones, timeout, semilla, ruta_db, cola):
+    """Correr una sesión en su propio proceso y enviar sus resultados por la cola.
+
+    AppTest.run() crea y borra la instancia global del Runtime de Streamlit en
+    cada llamada, así que dos sesiones en hilos del mismo proceso se pisan.
+    """
+    os.environ["PELICULAS_DB"] = ruta_db
+    registro = Registro()
+    abortada = None
+    try:
+        sesion = sesion_viewer if tipo == "viewer" else sesion_editor
+        sesion(username, iteraciones, registro, timeout, semilla)
+    except Exception as e:
+        abortada = f"{username}: {type(e).__name__}: {e}"
+    cola.put({**registro.resultado(), 'abortada': abortada})
+
+
+def preparar_db(filas, viewers, editores):
+    """Crear la base de datos temporal con catálogo sintético y usuarios de carga"""
+    import app
+    import benchmark
+
+    app.init_database()
+    benchmark.poblar_db(filas)
+    for i in range(viewers):
+        app.crear_usuario(f"carga_viewer_{i}", PASSWORD_CARGA, f"Viewer de carga {i}", "viewer")
+    for i in range(editores):
+        app.crear_usuario(f"carga_editor_{i}", PASSWORD_CARGA, f"Editor de carga {i}", "editor")
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga concurrente de app.py")
+    parser.add_argument("--viewers", type=int, default=8)
+    parser.add_argument("--editores", type=int, default=4)
+    parser.add_argument("--iteraciones", type=int, default=5)
+    parser.add_argument("--filas", type=int, default=10000)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--salida", default=None, help="archivo JSON con el reporte")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        # La app lee la ruta de la BD al importarse, antes de preparar los datos
+        os.environ["PELICULAS_DB"] = os.path.join(directorio, "carga.db")
+        preparar_db(args.filas, args.viewers, args.editores)
+
+        ruta_db = os.environ["PELICULAS_DB"]
+        contexto = multiprocessing.get_context("spawn")
+        cola = contexto.Queue()
+        sesiones = [("viewer", f"carga_viewer_{i}", i) for i in range(args.viewers)]
+        sesiones += [("editor", f"carga_editor_{i}", 1000 + i) for i in range(args.editores)]
+        procesos = [
+            contexto.Process(target=ejecutar_sesion,
+                             args=(tipo, username, args.iteraciones, args.timeout, semilla, ruta_db, cola))
+            for tipo, username, semilla in sesiones
+        ]
+
+        inicio = time.perf_counter()
+        for proceso in procesos:
+            proceso.start()
+        # Se vacía la cola antes de join para que ningún proceso quede bloqueado al enviar
+        resultados = [cola.get() for _ in procesos]
+        for proceso in procesos:
+            proceso.join()
+        total = time.perf_counter() - inicio
+
+    latencias = {}
+    errores = {}
+    errores_bloqueo = 0
+    errores_harness = {}
+    fallidas = 0
+    for resultado in resultados:
+        for accion, tiempos in resultado['latencias'].items():
+            latencias.setdefault(accion, []).extend(tiempos)
+        for accion, n in resultado['errores'].items():
+            errores[accion] = errores.get(accion, 0) + n
+        errores_bloqueo += resultado['errores_bloqueo']
+        for accion, n in resultado['errores_harness'].items():
+            errores_harness[accion] = errores_harness.get(accion, 0) + n
+        if resultado['abortada']:
+            fallidas += 1
+            print(f"Sesión abortada: {resultado['abortada']}")
+
+    reruns = sum(len(v) for v in latencias.values())
+    reporte = {
+        'viewers': args.viewers,
+        'editores': args.editores,
+        'filas': args.filas,
+        'duracion_s': total,
+        'reruns': reruns,
+        'throughput_reruns_s': reruns / total if total else 0,
+        'errores_bloqueo': errores_bloqueo,
+        'errores_harness': errores_harness,
+        'sesiones_abortadas': fallidas,
+        'acciones': {
+            accion: {
+                'n': len(tiempos),
+                'p50_ms': percentil(tiempos, 50) * 1000,
+                'p95_ms': percentil(tiempos, 95) * 1000,
+                'p99_ms': percentil(tiempos, 99) * 1000,
+                'max_ms': max(tiempos) * 1000,
+                'errores': errores.get(accion, 0),
+            }
+            for accion, tiempos in sorted(latencias.items())
+        },
+    }
+
+    print(f"{'acción':<32} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'máx ms':>9} {'errores':>8}")
+    for accion, datos in reporte['acciones'].items():
+        print(f"{accion:<32} {datos['n']:>5} {datos['p50_ms']:>9.1f} {datos['p95_ms']:>9.1f} "
+              f"{datos['p99_ms']:>9.1f} {datos['max_ms']:>9.1f} {datos['errores']:>8}")
+    print(f"\nReruns: {reruns} en {total:.1f} s ({reporte['throughput_reruns_s']:.1f} reruns/s)")
+    print(f"Errores de bloqueo: {errores_bloqueo} | Sesiones abortadas: {fallidas}")
+    if errores_harness:
+        print(f"Excepciones de AppTest (no cuentan como errores de la app): {errores_harness}")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(reporte, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
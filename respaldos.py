@@ -0,0 +1,43 @@
+"""Respaldos de la base de datos desde la línea de comandos.
+
+Uso:
+    python respaldos.py crear
+    python respaldos.py listar
+    python respaldos.py restaurar peliculas_20250101_120000_000000_manual.db
+
+Usa las mismas funciones que la pestaña "💾 Respaldos" de la app, por lo que
+la BD puede respaldarse o restaurarse mientras la app sigue en uso. Al
+restaurar se avanza PRAGMA user_version y la app en ejecución reinicia sus
+cachés en el siguiente rerun.
+"""
+import argparse
+import sys
+
+import app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Respaldos en línea de la base de datos")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+    subparsers.add_parser("crear", help="crear un respaldo ahora")
+    subparsers.add_parser("listar", help="listar respaldos disponibles")
+    restaurar = subparsers.add_parser("restaurar", help="restaurar un respaldo")
+    restaurar.add_argument("nombre", help="nombre del archivo de respaldo")
+    args = parser.parse_args()
+
+    if args.comando == "listar":
+        for respaldo in app.listar_respaldos():
+            print(f"{respaldo['nombre']}  {respaldo['fecha']:%Y-%m-%d %H:%M:%S}  {respaldo['tamano'] / 1024:.1f} KB")
+        return
+
+    if args.comando == "crear":
+        success, msg, _ = app.crear_respaldo()
+    else:
+        success, msg = app.restaurar_respaldo(args.nombre)
+    print(msg)
+    if not success:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
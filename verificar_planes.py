@@ -0,0 +1,90 @@
+"""Verificación de planes de consulta de app.py.
+
+Uso:
+    python verificar_planes.py --filas 20000
+
+Ejecuta EXPLAIN QUERY PLAN para cada consulta de app.CONSULTAS contra una
+base de datos temporal poblada con el catálogo sintético de benchmark.py.
+Termina con código 1 si alguna consulta recorre una tabla (SCAN, aunque sea
+sobre un índice) o necesita un B-tree temporal para ordenar, salvo las que
+app.CONSULTAS_ESCANEO_COMPLETO permite con su motivo. Un SCAN en el orden de
+un índice se acepta solo si la consulta tiene LIMIT (paginación acotada).
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+
+
+def problemas_plan(conn, sql):
+    """Devolver las líneas del plan que indican un camino O(n)"""
+    parametros = [None] * sql.count("?")
+    plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}", parametros).fetchall()
+    acotada = " LIMIT " in f" {sql.upper()} "
+    problemas = []
+    for fila in plan:
+        detalle = fila[-1]
+        if "TEMP B-TREE" in detalle:
+            problemas.append(detalle)
+        elif detalle.startswith("SCAN") and not (acotada and " USING " in detalle and "INDEX" in detalle):
+            problemas.append(detalle)
+    return [fila[-1] for fila in plan], problemas
+
+
+def verificar(conn, consultas, excluidas):
+    """Revisar todas las consultas y devolver {nombre: problemas} de las que fallan.
+
+    `excluidas` es un dict {nombre: motivo} con los recorridos permitidos.
+    """
+    fallidas = {}
+    for nombre, sql in consultas.items():
+        plan, problemas = problemas_plan(conn, sql)
+        if not problemas:
+            estado = "OK"
+        elif nombre in excluidas:
+            estado = f"ESCANEO PERMITIDO: {excluidas[nombre]}"
+        else:
+            estado = "FALLA"
+        print(f"[{estado}] {nombre}")
+        for detalle in plan:
+            print(f"    {detalle}")
+        if problemas and nombre not in excluidas:
+            fallidas[nombre] = problemas
+    return fallidas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verificar los planes de consulta de app.py")
+    parser.add_argument("--filas", type=int, default=20000)
+    parser.add_argument("--analyze", action="store_true",
+                        help="ejecutar ANALYZE antes de revisar los planes")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        # La app lee la ruta de la BD al importarse
+        os.environ["PELICULAS_DB"] = os.path.join(directorio, "planes.db")
+        import app
+        import benchmark
+
+        app.init_database()
+        benchmark.poblar_db(args.filas)
+        for i in range(100):
+            app.crear_usuario(f"planes_{i}", "planes123", f"Usuario {i}", "viewer")
+
+        conn = sqlite3.connect(app.DB_FILE)
+        if args.analyze:
+            conn.execute("ANALYZE")
+        fallidas = verificar(conn, app.CONSULTAS, app.CONSULTAS_ESCANEO_COMPLETO)
+        conn.close()
+
+    if fallidas:
+        print(f"\n❌ {len(fallidas)} consultas con recorrido completo u ordenamiento temporal:")
+        for nombre, problemas in fallidas.items():
+            print(f"  - {nombre}: {'; '.join(problemas)}")
+        sys.exit(1)
+    print(f"\n✅ {len(app.CONSULTAS)} consultas revisadas sin regresiones")
+
+
+if __name__ == "__main__":
+    main()